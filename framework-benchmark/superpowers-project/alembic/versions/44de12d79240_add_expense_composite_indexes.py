@@ -0,0 +1,40 @@
+"""Add expense composite indexes
+
+Revision ID: 44de12d79240
+Revises: 38c2b2a033d6
+Create Date: 2026-10-18 09:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '44de12d79240'
+down_revision: Union[str, None] = '38c2b2a033d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_expenses_user_date_id', 'expenses',
+        ['user_id', sa.text('date DESC'), sa.text('id DESC')],
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_expenses_user_category_date', 'expenses',
+        ['user_id', 'category', 'date'],
+        if_not_exists=True
+    )
+    # Both composites lead with user_id, so the single-column index only
+    # costs writes now.
+    op.drop_index('ix_expenses_user_id', table_name='expenses', if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index('ix_expenses_user_id', 'expenses', ['user_id'], if_not_exists=True)
+    op.drop_index('ix_expenses_user_category_date', table_name='expenses', if_exists=True)
+    op.drop_index('ix_expenses_user_date_id', table_name='expenses', if_exists=True)
@@ -0,0 +1,49 @@
+"""Add expense rollups
+
+Revision ID: 9b71e0c4d2a8
+Revises: 44de12d79240
+Create Date: 2026-10-18 10:04:51.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b71e0c4d2a8'
+down_revision: Union[str, None] = '44de12d79240'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The app's startup create_all may already have made the table.
+    if sa.inspect(op.get_bind()).has_table('expense_rollups'):
+        return
+    op.create_table(
+        'expense_rollups',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('period', sa.Date(), nullable=False),
+        sa.Column(
+            'category',
+            postgresql.ENUM(name='expensecategory', create_type=False),
+            nullable=False
+        ),
+        sa.Column('total', sa.Numeric(14, 2), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'period', 'category')
+    )
+    op.execute("""
+        INSERT INTO expense_rollups (user_id, period, category, total, count)
+        SELECT user_id, date_trunc('month', date)::date, category, sum(amount), count(*)
+        FROM expenses
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('expense_rollups')
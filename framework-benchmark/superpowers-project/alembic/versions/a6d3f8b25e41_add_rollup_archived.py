@@ -0,0 +1,33 @@
+"""Add rollup archived flag
+
+Revision ID: a6d3f8b25e41
+Revises: f7c2e91b4d06
+Create Date: 2026-10-18 17:40:12.604917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3f8b25e41'
+down_revision: Union[str, None] = 'f7c2e91b4d06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Startup create_all may have already built the table with the column.
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('expense_rollups')}
+    if 'archived' in columns:
+        return
+    op.add_column(
+        'expense_rollups',
+        sa.Column('archived', sa.Boolean(), server_default=sa.false(), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('expense_rollups', 'archived')
@@ -0,0 +1,33 @@
+"""Add user data version
+
+Revision ID: c3e5a17f6b90
+Revises: 9b71e0c4d2a8
+Create Date: 2026-10-18 11:26:07.514382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a17f6b90'
+down_revision: Union[str, None] = '9b71e0c4d2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Startup create_all may have already built users with the column.
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'data_version' in columns:
+        return
+    op.add_column(
+        'users',
+        sa.Column('data_version', sa.BigInteger(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'data_version')
@@ -0,0 +1,97 @@
+"""Partition expenses by date
+
+Revision ID: e4a9c7d21f58
+Revises: d81f4c2a9e37
+Create Date: 2026-10-18 14:21:07.530194
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app import partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c7d21f58'
+down_revision: Union[str, None] = 'd81f4c2a9e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, user_id, amount, category, description, date, created_at, updated_at"
+
+
+def _is_partitioned(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('expenses')"
+    )).scalar() is True
+
+
+def _create_expenses(partitioned: bool) -> None:
+    op.create_table(
+        'expenses',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+        sa.Column(
+            'category',
+            postgresql.ENUM(name='expensecategory', create_type=False),
+            nullable=False
+        ),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='expenses_user_id_fkey'),
+        sa.PrimaryKeyConstraint(*(('id', 'date') if partitioned else ('id',))),
+        **({'postgresql_partition_by': 'RANGE (date)'} if partitioned else {})
+    )
+    op.create_index(
+        'ix_expenses_user_date_id', 'expenses',
+        ['user_id', sa.text('date DESC'), sa.text('id DESC')]
+    )
+    op.create_index('ix_expenses_user_category_date', 'expenses', ['user_id', 'category', 'date'])
+
+
+def _rename_old_table() -> None:
+    op.rename_table('expenses', 'expenses_old')
+    op.execute("ALTER TABLE expenses_old RENAME CONSTRAINT expenses_pkey TO expenses_old_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_expenses_user_date_id RENAME TO ix_expenses_old_user_date_id")
+    op.execute(
+        "ALTER INDEX IF EXISTS ix_expenses_user_category_date "
+        "RENAME TO ix_expenses_old_user_category_date"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if _is_partitioned(bind):
+        return
+
+    # Rebuilding is a full copy of the table; run it in a maintenance window.
+    _rename_old_table()
+    _create_expenses(partitioned=True)
+    partitions.create_default_partition(bind)
+
+    first = bind.execute(sa.text("SELECT min(date) FROM expenses_old")).scalar()
+    partitions.ensure_partitions(bind, first or date.today(), date.today())
+    partitions.ensure_upcoming(bind)
+
+    op.execute(f"INSERT INTO expenses ({COLUMNS}) SELECT {COLUMNS} FROM expenses_old")
+    op.drop_table('expenses_old')
+    op.execute("ANALYZE expenses")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not _is_partitioned(bind):
+        return
+
+    _rename_old_table()
+    _create_expenses(partitioned=False)
+    op.execute(f"INSERT INTO expenses ({COLUMNS}) SELECT {COLUMNS} FROM expenses_old")
+    # Drops every attached partition along with the parent.
+    op.drop_table('expenses_old')
@@ -0,0 +1,33 @@
+"""Add user data moved flag
+
+Revision ID: f7c2e91b4d06
+Revises: e4a9c7d21f58
+Create Date: 2026-10-18 16:02:44.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2e91b4d06'
+down_revision: Union[str, None] = 'e4a9c7d21f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Startup create_all may have already built users with the column.
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'data_moved' in columns:
+        return
+    op.add_column(
+        'users',
+        sa.Column('data_moved', sa.Boolean(), server_default=sa.false(), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'data_moved')
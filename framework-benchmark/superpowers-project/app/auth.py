@@ -1,20 +1,82 @@
+import hmac
+from dataclasses import dataclass
+
 from fastapi import HTTPException, Header, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from typing import Optional
+from uuid import UUID
 
+from app.cache import TTLCache
+from app.config import settings
 from app.database import get_db
 from app.models import User
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    id: UUID
+    api_key: str
+
+
+api_key_cache = TTLCache(
+    max_size=settings.auth_cache_max_size,
+    ttl=settings.auth_cache_ttl_seconds
+)
+
+
 def get_current_user(
     x_api_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
-) -> User:
+) -> CurrentUser:
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
-    user = db.query(User).filter(User.api_key == x_api_key).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid API key")
+    user_id = api_key_cache.get(x_api_key)
+    if user_id is None:
+        user_id = db.query(User.id).filter(User.api_key == x_api_key).scalar()
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        api_key_cache.set(x_api_key, user_id)
+
+    return CurrentUser(id=user_id, api_key=x_api_key)
+
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)) -> None:
+    if not settings.internal_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, settings.internal_token):
+        raise HTTPException(status_code=401, detail="Invalid internal token")
+
+
+def invalidate_api_key(api_key: str) -> None:
+    api_key_cache.invalidate(api_key)
+
+
+def invalidate_user(user_id: UUID) -> None:
+    api_key_cache.invalidate_where(lambda key, cached_id: cached_id == user_id)
+
+
+def _revoke_on_commit(target: User) -> None:
+    # Drop the entries now, and again once the change is visible to other
+    # sessions, so a lookup racing the commit can't re-cache the old key.
+    invalidate_user(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("revoked_user_ids", set()).add(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User) -> None:
+    _revoke_on_commit(target)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User) -> None:
+    _revoke_on_commit(target)
+
 
-    return user
+@event.listens_for(Session, "after_commit")
+def _flush_revocations(session: Session) -> None:
+    for user_id in session.info.pop("revoked_user_ids", ()):
+        invalidate_user(user_id)
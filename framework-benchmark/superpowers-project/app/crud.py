@@ -1,29 +1,59 @@
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
-from typing import Optional
-from uuid import UUID
+from typing import Iterator, Optional
+from uuid import UUID, uuid4
 
-from sqlalchemy import func, extract
+from sqlalchemy import Date, DateTime, cast, delete, func, insert, select, text, tuple_, update
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
-from app.models import Expense, ExpenseCategory
-from app.schemas import ExpenseCreate, ExpenseUpdate, MonthlySummary, MonthlySummaryItem
+from app.models import Expense, ExpenseCategory, ExpenseRollup, User
+from app import rollups
+from app.replicas import is_replica
+from app.summary_cache import summary_cache
+from app.schemas import (
+    ExpenseCreate, ExpenseUpdate, MonthlySummary, MonthlySummaryItem,
+    SeriesBucket, SeriesValues, SummarySeries, TotalKind
+)
 
 
 def create_expense(db: Session, expense_in: ExpenseCreate, user_id: UUID) -> Expense:
-    db_expense = Expense(
-        user_id=user_id,
-        amount=expense_in.amount,
-        category=expense_in.category,
-        description=expense_in.description,
-        date=expense_in.date
-    )
-    db.add(db_expense)
+    db_expense, = insert_expenses(db, [{"user_id": user_id, **expense_in.model_dump()}])
     db.commit()
-    db.refresh(db_expense)
     return db_expense
 
 
+def insert_expenses(db: Session, rows: list[dict]) -> list[Expense]:
+    # Multi-row INSERT ... RETURNING, results in input order. The caller commits.
+    if not rows:
+        return []
+
+    # Ids are assigned here rather than asking RETURNING to preserve
+    # parameter order, which would fall back to one INSERT per row.
+    rows = [{"id": uuid4(), **row} for row in rows]
+    inserted = {
+        expense.id: expense
+        for expense in db.scalars(insert(Expense).returning(Expense), rows)
+    }
+    expenses = [inserted[row["id"]] for row in rows]
+
+    # Core-level inserts skip the flush hook, so feed the rollups directly.
+    deltas = rollups.new_deltas()
+    for row in rows:
+        rollups.add_delta(deltas, row["user_id"], row["date"], row["category"], row["amount"])
+    rollups.apply_deltas(db, deltas)
+
+    return expenses
+
+
+def bulk_create_expenses(db: Session, items: list[ExpenseCreate], user_id: UUID) -> list[UUID]:
+    expenses = insert_expenses(db, [{"user_id": user_id, **item.model_dump()} for item in items])
+    # Read ids before the commit expires the instances.
+    ids = [expense.id for expense in expenses]
+    db.commit()
+    return ids
+
+
 def get_expense(db: Session, expense_id: UUID, user_id: UUID) -> Optional[Expense]:
     return db.query(Expense).filter(
         Expense.id == expense_id,
@@ -31,6 +61,42 @@ def get_expense(db: Session, expense_id: UUID, user_id: UUID) -> Optional[Expens
     ).first()
 
 
+def get_data_version(db: Session, user_id: UUID) -> int:
+    return db.query(User.data_version).filter(User.id == user_id).scalar() or 0
+
+
+def expense_filters(
+    user_id: UUID,
+    category: Optional[ExpenseCategory] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> list:
+    clauses = [Expense.user_id == user_id]
+    if category:
+        clauses.append(Expense.category == category)
+    if start_date:
+        clauses.append(Expense.date >= start_date)
+    if end_date == date.max:
+        # The day after has no Python date, and every row is on or before it.
+        clauses.append(Expense.date <= end_date)
+    elif end_date:
+        clauses.append(Expense.date < end_date + timedelta(days=1))
+    return clauses
+
+
+def cursor_filters(cursor: tuple[date, UUID]) -> list:
+    # The row comparison alone can't prune partitions; the plain date
+    # bound lets the planner skip every partition newer than the cursor.
+    return [Expense.date <= cursor[0], tuple_(Expense.date, Expense.id) < tuple_(*cursor)]
+
+
+# In ExpenseOut's field order, so rows serialize to the same JSON.
+EXPENSE_COLUMNS = (
+    Expense.amount, Expense.category, Expense.description, Expense.date,
+    Expense.id, Expense.created_at, Expense.updated_at
+)
+
+
 def get_expenses(
     db: Session,
     user_id: UUID,
@@ -38,21 +104,62 @@ def get_expenses(
     limit: int = 100,
     category: Optional[ExpenseCategory] = None,
     start_date: Optional[date] = None,
-    end_date: Optional[date] = None
-) -> tuple[list[Expense], int]:
-    query = db.query(Expense).filter(Expense.user_id == user_id)
+    end_date: Optional[date] = None,
+    cursor: Optional[tuple[date, UUID]] = None,
+    total_kind: TotalKind = TotalKind.EXACT
+) -> tuple[list[Row], Optional[int], bool]:
+    # Plain rows: list responses never need identity-mapped instances.
+    query = db.query(*EXPENSE_COLUMNS).filter(
+        *expense_filters(user_id, category, start_date, end_date)
+    )
 
-    if category:
-        query = query.filter(Expense.category == category)
-    if start_date:
-        query = query.filter(Expense.date >= start_date)
-    if end_date:
-        query = query.filter(Expense.date <= end_date)
+    total = None
+    if total_kind == TotalKind.EXACT:
+        total = query.count()
+    elif total_kind == TotalKind.ESTIMATED:
+        total = estimate_expense_count(db, user_id)
+
+    query = query.order_by(Expense.date.desc(), Expense.id.desc())
+
+    # Seek past the last row of the previous page instead of counting
+    # through an OFFSET; cost stays flat however deep the client pages.
+    if cursor:
+        query = query.filter(*cursor_filters(cursor))
+    else:
+        query = query.offset(skip)
+
+    # One extra row tells us whether another page exists without a COUNT.
+    expenses = query.limit(limit + 1).all()
+    has_more = len(expenses) > limit
+
+    return expenses[:limit], total, has_more
+
+
+def iter_expenses(
+    db: Session,
+    user_id: UUID,
+    category: Optional[ExpenseCategory] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    batch_size: int = 1000
+) -> Iterator[list[Row]]:
+    # yield_per streams from a server-side cursor, so only one batch of
+    # rows is ever held in memory.
+    result = db.execute(
+        select(*EXPENSE_COLUMNS)
+        .where(*expense_filters(user_id, category, start_date, end_date))
+        .order_by(Expense.date.desc(), Expense.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    yield from result.partitions()
+
+
+ESTIMATE_COUNT_SQL = text("EXPLAIN (FORMAT JSON) SELECT 1 FROM expenses WHERE user_id = :user_id")
 
-    total = query.count()
-    expenses = query.order_by(Expense.date.desc()).offset(skip).limit(limit).all()
 
-    return expenses, total
+def estimate_expense_count(db: Session, user_id: UUID) -> int:
+    plan = db.execute(ESTIMATE_COUNT_SQL, {"user_id": str(user_id)}).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
 
 
 def update_expense(db: Session, db_expense: Expense, expense_in: ExpenseUpdate) -> Expense:
@@ -70,21 +177,104 @@ def delete_expense(db: Session, db_expense: Expense) -> None:
     db.commit()
 
 
+def update_expense_by_id(
+    db: Session,
+    expense_id: UUID,
+    user_id: UUID,
+    expense_in: ExpenseUpdate
+) -> Optional[Expense]:
+    update_data = expense_in.model_dump(exclude_unset=True)
+    if not update_data:
+        return get_expense(db, expense_id, user_id)
+
+    # One round trip: lock the row, update it and return both the new row
+    # and the values the rollups need to back out.
+    previous = select(
+        Expense.id, Expense.amount, Expense.category, Expense.date
+    ).where(
+        Expense.id == expense_id,
+        Expense.user_id == user_id
+    ).with_for_update().cte("previous")
+
+    row = db.execute(
+        update(Expense)
+        .where(Expense.id == previous.c.id)
+        .values(**update_data)
+        .returning(Expense, previous.c.amount, previous.c.category, previous.c.date)
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+
+    db_expense, old_amount, old_category, old_date = row
+    deltas = rollups.new_deltas()
+    rollups.add_delta(deltas, user_id, old_date, old_category, old_amount, -1)
+    rollups.add_delta(deltas, user_id, db_expense.date, db_expense.category, db_expense.amount)
+    rollups.apply_deltas(db, deltas)
+
+    db.commit()
+    return db_expense
+
+
+def delete_expense_by_id(db: Session, expense_id: UUID, user_id: UUID) -> bool:
+    row = db.execute(
+        delete(Expense)
+        .where(Expense.id == expense_id, Expense.user_id == user_id)
+        .returning(Expense.amount, Expense.category, Expense.date)
+    ).first()
+    if row is None:
+        db.rollback()
+        return False
+
+    deltas = rollups.new_deltas()
+    rollups.add_delta(deltas, user_id, row.date, row.category, row.amount, -1)
+    rollups.apply_deltas(db, deltas)
+
+    db.commit()
+    return True
+
+
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
 def get_monthly_summary(
     db: Session,
     user_id: UUID,
     year: int,
-    month: int
+    month: int,
+    version: Optional[int] = None
 ) -> MonthlySummary:
+    if version is None:
+        version = get_data_version(db, user_id)
+    # Read the version before the rollups: a write committing in between
+    # can then only leave newer totals under the older key, never the
+    # reverse.
+    key = (user_id, year, month, version)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached
+
+    start, _ = month_bounds(year, month)
     results = db.query(
-        Expense.category,
-        func.sum(Expense.amount).label('total')
+        ExpenseRollup.category,
+        ExpenseRollup.total
     ).filter(
-        Expense.user_id == user_id,
-        extract('year', Expense.date) == year,
-        extract('month', Expense.date) == month
-    ).group_by(Expense.category).all()
+        ExpenseRollup.user_id == user_id,
+        ExpenseRollup.period == start,
+        ExpenseRollup.count > 0
+    ).all()
+
+    summary = build_monthly_summary(year, month, results)
+    # A lagging replica could otherwise pin a stale summary for the full TTL.
+    if not is_replica(db):
+        summary_cache.set(key, summary)
+    return summary
 
+
+def build_monthly_summary(year: int, month: int, results) -> MonthlySummary:
     categories = [
         MonthlySummaryItem(category=cat, total=Decimal(str(total)))
         for cat, total in results
@@ -98,3 +288,90 @@ def get_monthly_summary(
         categories=categories,
         grand_total=grand_total
     )
+
+
+def bucket_start(day: date, bucket: SeriesBucket) -> date:
+    if bucket == SeriesBucket.WEEK:
+        return day - timedelta(days=day.weekday())
+    if bucket == SeriesBucket.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day: date, bucket: SeriesBucket) -> date:
+    if bucket == SeriesBucket.MONTH:
+        return month_bounds(day.year, day.month)[1]
+    return day + timedelta(days=7 if bucket == SeriesBucket.WEEK else 1)
+
+
+def bucket_count(start: date, end: date, bucket: SeriesBucket) -> int:
+    # Arithmetic, so a huge range can be rejected without enumerating it.
+    first = bucket_start(start, bucket)
+    if bucket == SeriesBucket.MONTH:
+        return (end.year - first.year) * 12 + end.month - first.month + 1
+    return (end - first).days // (7 if bucket == SeriesBucket.WEEK else 1) + 1
+
+
+def series_buckets(start: date, end: date, bucket: SeriesBucket) -> list[date]:
+    # Only steps to a bucket that exists, so ranges ending at date.max
+    # never compute the period after it.
+    count = bucket_count(start, end, bucket)
+    buckets = [bucket_start(start, bucket)]
+    while len(buckets) < count:
+        buckets.append(next_bucket(buckets[-1], bucket))
+    return buckets
+
+
+def get_summary_series(
+    db: Session,
+    user_id: UUID,
+    start: date,
+    end: date,
+    bucket: SeriesBucket,
+    by_category: bool = False
+) -> SummarySeries:
+    # Whole months can be read straight from the rollups; anything else
+    # is one grouped scan over the (user_id, date) index.
+    month_end = end == date.max or (end + timedelta(days=1)).day == 1
+    if bucket == SeriesBucket.MONTH and start.day == 1 and month_end:
+        rows = db.query(
+            ExpenseRollup.period, ExpenseRollup.category, ExpenseRollup.total, ExpenseRollup.count
+        ).filter(
+            ExpenseRollup.user_id == user_id,
+            ExpenseRollup.period >= start,
+            ExpenseRollup.period <= end
+        ).all()
+    else:
+        period = cast(func.date_trunc(bucket.value, cast(Expense.date, DateTime)), Date)
+        rows = db.query(
+            period, Expense.category, func.sum(Expense.amount), func.count()
+        ).filter(
+            *expense_filters(user_id, start_date=start, end_date=end)
+        ).group_by(period, Expense.category).all()
+
+    buckets = series_buckets(start, end, bucket)
+    index = {day: i for i, day in enumerate(buckets)}
+    totals = [Decimal("0.00")] * len(buckets)
+    counts = [0] * len(buckets)
+    categories: dict[ExpenseCategory, SeriesValues] = {}
+
+    for day, category, total, count in rows:
+        i = index[day]
+        totals[i] += total
+        counts[i] += count
+        if by_category:
+            values = categories.setdefault(category, SeriesValues(
+                totals=[Decimal("0.00")] * len(buckets), counts=[0] * len(buckets)
+            ))
+            values.totals[i] += total
+            values.counts[i] += count
+
+    return SummarySeries(
+        start=start,
+        end=end,
+        bucket=bucket,
+        buckets=buckets,
+        totals=totals,
+        counts=counts,
+        categories=categories if by_category else None
+    )
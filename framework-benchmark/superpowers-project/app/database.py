@@ -1,10 +1,101 @@
+import time
+from threading import Lock
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 
 from app.config import settings
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class CheckoutStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+
+class _TimedCheckout:
+    # Times the whole checkout: queueing for a free slot, opening new
+    # connections and pre-ping.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.checkout_stats.record(time.perf_counter() - start, timed_out)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+def pool_options() -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _connect_args() -> dict:
+    if not settings.db_statement_timeout_ms:
+        return {}
+    return {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+
+
+def pool_stats(target) -> dict:
+    pool = target.pool
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    checkout = getattr(pool, "checkout_stats", None)
+    if checkout is not None:
+        stats.update({
+            "checkouts": checkout.checkouts,
+            "timeouts": checkout.timeouts,
+            "wait_avg_ms": 1000 * checkout.wait_total / checkout.checkouts if checkout.checkouts else 0.0,
+            "wait_max_ms": 1000 * checkout.wait_max,
+        })
+    return stats
+
+
+def build_engine(url: str):
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        connect_args=_connect_args(),
+        **pool_options()
+    )
+
+
+engine = build_engine(settings.database_url)
+# Request sessions end right after the response is built, so there is no
+# point re-selecting rows that a write has just returned.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -0,0 +1,37 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator
+
+from sqlalchemy.engine import Row
+
+from app.crud import EXPENSE_COLUMNS
+
+FIELDS = [column.key for column in EXPENSE_COLUMNS]
+
+
+def _values(row: Row) -> list:
+    amount, category, description, day, expense_id, created_at, updated_at = row
+    return [
+        str(amount), category.value, description, day.isoformat(),
+        str(expense_id), created_at.isoformat(), updated_at.isoformat()
+    ]
+
+
+def csv_chunks(batches: Iterable[list[Row]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for batch in batches:
+        writer.writerows(_values(row) for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(batches: Iterable[list[Row]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(FIELDS, _values(row)))) + "\n" for row in batch
+        )
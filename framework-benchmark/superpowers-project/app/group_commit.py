@@ -0,0 +1,136 @@
+import logging
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.config import settings
+from app.metrics import registry
+from app.schemas import ExpenseOut
+from app.shards import PRIMARY, shard_map
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitter:
+    """Queues single expense inserts and commits them together.
+
+    One background thread drains the queue into multi-row INSERT batches,
+    so many concurrent creates share a single COMMIT (and its fsync). A
+    batch is flushed once it has ``max_batch`` rows or its first row has
+    waited ``max_delay`` seconds, which bounds the latency added to each
+    request.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch: int = 500,
+        max_delay: float = 0.005
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def submit(self, row: dict) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+            self._queue.put((row, future))
+        return future
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join()
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: list) -> None:
+        try:
+            results = self._insert([row for row, _ in batch])
+        except Exception:
+            # One bad row must not fail its neighbours: retry them alone
+            # so only the offending request sees the error.
+            logger.exception("group commit batch of %d failed; retrying rows singly", len(batch))
+            for row, future in batch:
+                try:
+                    result, = self._insert([row])
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+            return
+
+        registry.observe("group_commit_batch_size", (), len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _insert(self, rows: list[dict]) -> list[ExpenseOut]:
+        with self.session_factory() as db:
+            try:
+                expenses = crud.insert_expenses(db, rows)
+                results = [ExpenseOut.model_validate(expense) for expense in expenses]
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        return results
+
+
+def build_committer(session_factory: Callable[[], Session]) -> GroupCommitter:
+    return GroupCommitter(
+        session_factory,
+        max_batch=settings.group_commit_max_batch,
+        max_delay=settings.group_commit_max_delay_ms / 1000
+    )
+
+
+# A batch is one transaction, so every shard needs its own queue.
+group_committer = build_committer(shard_map.session_factories[PRIMARY])
+shard_committers = {
+    name: build_committer(factory)
+    for name, factory in shard_map.session_factories.items()
+    if name != PRIMARY
+}
+registry.gauge("group_commit_queued", "Expense creates waiting for the next group commit.")
+registry.gauge_source(lambda: {
+    "group_commit_queued": group_committer.queued() + sum(c.queued() for c in shard_committers.values())
+})
@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Depends, Header, HTTPException, Request
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.auth import CurrentUser, get_current_user
+from app.config import settings
+from app.models import IdempotencyKey
+from app.shards import get_user_db, shard_map
+
+MAX_KEY_LENGTH = 255
+
+
+@dataclass(frozen=True)
+class PendingKey:
+    user_id: UUID
+    key: str
+    fingerprint: str
+
+
+class IdempotentReplay(Exception):
+    def __init__(self, status_code: int, body: str):
+        self.status_code = status_code
+        self.body = body
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def lookup(db: Session, user_id: UUID, key: str) -> Optional[IdempotencyKey]:
+    return db.scalars(
+        select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > datetime.utcnow()
+        )
+    ).first()
+
+
+def check(stored: IdempotencyKey, pending: PendingKey) -> None:
+    if stored.fingerprint != pending.fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request"
+        )
+    raise IdempotentReplay(stored.status_code, stored.response_body)
+
+
+def save(db: Session, pending: PendingKey, status_code: int, body: str) -> bool:
+    # Runs in the same transaction as the write it records, so the key and
+    # the row commit together. A concurrent request with the same key waits
+    # on our uncommitted row and then conflicts; an expired row is reused.
+    # The caller commits.
+    now = datetime.utcnow()
+    values = {
+        "user_id": pending.user_id,
+        "key": pending.key,
+        "fingerprint": pending.fingerprint,
+        "status_code": status_code,
+        "response_body": body,
+        "expires_at": now + timedelta(seconds=settings.idempotency_ttl_seconds),
+    }
+    stmt = insert(IdempotencyKey).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+        set_={name: stmt.excluded[name] for name in values if name not in ("user_id", "key")},
+        where=IdempotencyKey.expires_at <= now
+    ).returning(IdempotencyKey.key)
+    return db.execute(stmt).first() is not None
+
+
+def purge_expired(db: Session, batch_size: Optional[int] = None) -> int:
+    # Small batches keep each DELETE short so it never holds locks for
+    # long against the inserts that are creating new keys.
+    batch_size = batch_size or settings.idempotency_purge_batch
+    expired = (
+        select(IdempotencyKey.user_id, IdempotencyKey.key)
+        .where(IdempotencyKey.expires_at <= datetime.utcnow())
+        .limit(batch_size)
+    )
+    purged = 0
+    while True:
+        result = db.execute(
+            delete(IdempotencyKey)
+            .where(tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired))
+        )
+        db.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+
+
+async def request_body(request: Request) -> bytes:
+    return await request.body()
+
+
+def idempotency_key(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
+    body: bytes = Depends(request_body),
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Optional[PendingKey]:
+    # Dependencies are resolved before the body is validated, so a replay
+    # returns the stored response without parsing the request at all.
+    if idempotency_key is None:
+        return None
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+        )
+
+    pending = PendingKey(
+        user_id=current_user.id,
+        key=idempotency_key,
+        fingerprint=fingerprint(request.method, request.url.path, body)
+    )
+    stored = lookup(db, pending.user_id, pending.key)
+    if stored is not None:
+        check(stored, pending)
+    return pending
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the idempotency_keys table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    purge_cmd = sub.add_parser("purge", help="delete expired idempotency keys")
+    purge_cmd.add_argument("--batch-size", type=int, help="rows deleted per transaction")
+    args = parser.parse_args()
+
+    for shard in shard_map.names:
+        db = shard_map.session(shard)
+        try:
+            purged = purge_expired(db, args.batch_size)
+        finally:
+            db.close()
+        print(f"purged {purged} expired idempotency keys on {shard}")
+
+
+if __name__ == "__main__":
+    main()
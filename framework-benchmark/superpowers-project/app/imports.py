@@ -0,0 +1,134 @@
+import csv
+import io
+from datetime import datetime
+from typing import Iterable, Iterator
+from uuid import UUID, uuid4
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app import rollups
+from app.config import settings
+from app.schemas import ExpenseCreate, ImportResult, ImportRowError, error_details
+
+STAGING_TABLE = "expense_import_staging"
+
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class MalformedCSV(ValueError):
+    def __init__(self, line: int, reason: str):
+        super().__init__(f"Line {line}: {reason}")
+        self.line = line
+
+
+def _lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    # Decoded line by line, so a bad byte is reported on its own line
+    # rather than wherever a larger decode buffer happened to start.
+    raw = io.BufferedReader(ChunkStream(chunks))
+    for number, line in enumerate(iter(raw.readline, b""), start=1):
+        # Postgres text cannot hold NUL, so COPY would fail on it later.
+        if b"\x00" in line:
+            raise MalformedCSV(number, "contains a NUL byte")
+        try:
+            yield line.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError:
+            raise MalformedCSV(number, "not valid UTF-8") from None
+
+
+def read_csv(chunks: Iterable[bytes]) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(_lines(chunks))
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            raise MalformedCSV(reader.reader.line_num, str(exc)) from None
+        # CSV can't tell a missing description from an empty one.
+        if not row.get("description"):
+            row["description"] = None
+        yield reader.line_num, row
+
+
+def _copy_chunk(db: Session, user_id: UUID, chunk: list[ExpenseCreate]) -> None:
+    now = datetime.utcnow()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    deltas = rollups.new_deltas()
+    for item in chunk:
+        writer.writerow([
+            uuid4(), user_id, item.amount, item.category.name,
+            item.description, item.date, now, now
+        ])
+        rollups.add_delta(deltas, user_id, item.date, item.category, item.amount)
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {STAGING_TABLE} FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(f"INSERT INTO expenses SELECT * FROM {STAGING_TABLE}")
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+    finally:
+        cursor.close()
+    rollups.apply_deltas(db, deltas)
+
+
+def import_csv(db: Session, user_id: UUID, chunks: Iterable[bytes]) -> ImportResult:
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE expenses) ON COMMIT DROP"
+        )
+    finally:
+        cursor.close()
+
+    imported = failed = 0
+    errors: list[ImportRowError] = []
+    chunk: list[ExpenseCreate] = []
+
+    for line, row in read_csv(chunks):
+        try:
+            chunk.append(ExpenseCreate.model_validate(row))
+        except ValidationError as exc:
+            failed += 1
+            if len(errors) < settings.import_max_errors:
+                errors.append(ImportRowError(line=line, errors=error_details(exc)))
+            continue
+
+        if len(chunk) >= settings.import_chunk_size:
+            _copy_chunk(db, user_id, chunk)
+            imported += len(chunk)
+            chunk = []
+
+    if chunk:
+        _copy_chunk(db, user_id, chunk)
+        imported += len(chunk)
+
+    db.commit()
+    return ImportResult(
+        imported=imported,
+        failed=failed,
+        errors=errors,
+        errors_truncated=failed > len(errors)
+    )
@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.metrics import observe_query, observe_request
+
+logger = logging.getLogger("app.perf")
+
+
+class StatementBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    db_seconds: float = 0.0
+    statements: int = 0
+    serialize_seconds: float = 0.0
+    handler_done: Optional[float] = None
+
+    def total_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        return ", ".join([
+            f"db;dur={self.db_seconds * 1000:.2f};desc=\"{self.statements} statements\"",
+            f"serialize;dur={self.serialize_seconds * 1000:.2f}",
+            f"app;dur={self.total_seconds() * 1000:.2f}",
+        ])
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    if (
+        metrics is not None and settings.perf_debug
+        and 0 < settings.perf_statement_budget <= metrics.statements
+    ):
+        raise StatementBudgetExceeded(
+            f"Statement budget of {settings.perf_statement_budget} exceeded"
+        )
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started")
+    observe_query(statement, elapsed)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.db_seconds += elapsed
+        metrics.statements += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentedRoute(APIRoute):
+    """Marks when the endpoint returns, so the time FastAPI then spends
+    validating and encoding the result is reported as serialization."""
+
+    def get_route_handler(self) -> Callable:
+        call = self.dependant.call
+        if not getattr(call, "_instrumented", False):
+            self.dependant.call = _mark_done(call)
+        handler = super().get_route_handler()
+
+        async def instrumented_handler(request):
+            response = await handler(request)
+            metrics = _current.get()
+            if metrics is not None and metrics.handler_done is not None:
+                metrics.serialize_seconds += time.perf_counter() - metrics.handler_done
+            return response
+
+        return instrumented_handler
+
+
+def _mark_done(call: Callable) -> Callable:
+    def done():
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.handler_done = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                done()
+    else:
+        @functools.wraps(call)
+        def wrapper(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                done()
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+class TimingMiddleware:
+    """Adds a Server-Timing header and logs one JSON line per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up cardinality.
+            observe_request(
+                scope["method"], route.path if route is not None else "unmatched",
+                status, metrics.total_seconds()
+            )
+            logger.info(json.dumps({
+                "method": scope["method"],
+                "route": route.path if route is not None else scope["path"],
+                "status": status,
+                "total_ms": round(metrics.total_seconds() * 1000, 2),
+                "db_ms": round(metrics.db_seconds * 1000, 2),
+                "statements": metrics.statements,
+                "serialize_ms": round(metrics.serialize_seconds * 1000, 2),
+            }))
@@ -1,70 +1,313 @@
+import asyncio
+import json
 from datetime import date
-from typing import Optional
+from typing import Literal, Optional
 from uuid import UUID
 
-from fastapi import FastAPI, Depends, HTTPException, Query
+import anyio
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from psycopg2.errors import DuplicateTable
+from pydantic import ValidationError
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.orm import Session
 
-from app.database import get_db, Base, engine
-from app.models import User
-from app.auth import get_current_user
-from app import crud, schemas
+from app.database import Base, engine, pool_stats
+from app.auth import CurrentUser, api_key_cache, get_current_user, require_internal_token
+from app.config import settings
+from app import analytics, crud, exports, idempotency, imports, partitions, schemas
+from app.serialization import FastJSONResponse, expense_rows
+from app.group_commit import group_committer, shard_committers
+from app.etags import etag_matches, make_etag, not_modified
+from app.instrumentation import (
+    InstrumentedRoute, StatementBudgetExceeded, TimingMiddleware, instrument_engine
+)
+from app.metrics import registry
+from app.replicas import get_read_db, replica_engines
+from app.shards import PRIMARY, UserMoved, get_user_db, shard_engines, shard_map
+from app.pagination import encode_cursor, decode_cursor
+from app.summary_cache import summary_cache
 
 app = FastAPI(title="Personal Expense Tracker API", version="1.0.0")
+app.router.route_class = InstrumentedRoute
+app.add_middleware(TimingMiddleware)
+instrument_engine(engine)
+for _other in [*replica_engines, *shard_engines.values()]:
+    instrument_engine(_other)
+
+
+@app.exception_handler(StatementBudgetExceeded)
+def statement_budget_exceeded(request: Request, exc: StatementBudgetExceeded):
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+
+@app.exception_handler(UserMoved)
+def user_moved(request: Request, exc: UserMoved):
+    # The write raced a shard move and was rolled back, so it is safe to retry.
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(idempotency.IdempotentReplay)
+def idempotent_replay(request: Request, exc: idempotency.IdempotentReplay):
+    return Response(
+        exc.body, status_code=exc.status_code, media_type="application/json",
+        headers={"Idempotent-Replayed": "true"}
+    )
 
 
 @app.on_event("startup")
 def startup_event():
-    Base.metadata.create_all(bind=engine)
+    for shard in [engine, *shard_engines.values()]:
+        Base.metadata.create_all(bind=shard)
+    for name in shard_map.names:
+        with shard_map.session(name) as db:
+            try:
+                partitions.ensure_upcoming(db)
+                db.commit()
+            except ProgrammingError as exc:
+                # Someone created the partition outside the lock; it exists
+                # either way, so this worker can still start.
+                if not isinstance(exc.orig, DuplicateTable):
+                    raise
+                db.rollback()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Flush anything still queued before the process exits.
+    for committer in [group_committer, *shard_committers.values()]:
+        committer.stop()
 
 
 @app.post("/api/v1/expenses", response_model=schemas.ExpenseOut, status_code=201)
-def create_expense(
+async def create_expense(
     expense_in: schemas.ExpenseCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    pending: Optional[idempotency.PendingKey] = Depends(idempotency.idempotency_key)
 ):
-    return crud.create_expense(db, expense_in, current_user.id)
+    row = {"user_id": current_user.id, **expense_in.model_dump()}
+    if pending is None and settings.group_commit:
+        shard = shard_map.shard_for(current_user.id)
+        committer = group_committer if shard == PRIMARY else shard_committers[shard]
+        return await asyncio.wrap_future(committer.submit(row))
+    return await run_in_threadpool(insert_expense, db, row, pending)
+
+
+def insert_expense(db: Session, row: dict, pending: Optional[idempotency.PendingKey]):
+    if pending is None:
+        expense, = crud.insert_expenses(db, [row])
+        db.commit()
+        return expense
+
+    # The stored body is exactly what we send, so a replay never has to
+    # load the expense or serialize it again.
+    expense, = crud.insert_expenses(db, [row])
+    body = schemas.ExpenseOut.model_validate(expense).model_dump_json()
+    if not idempotency.save(db, pending, 201, body):
+        # A concurrent request with the same key committed first.
+        db.rollback()
+        idempotency.check(idempotency.lookup(db, pending.user_id, pending.key), pending)
+    db.commit()
+    return Response(body, status_code=201, media_type="application/json")
+
+
+async def bulk_payload(request: Request) -> list:
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Body must be at most {settings.bulk_max_bytes} bytes"
+    )
+    if int(request.headers.get("content-length") or 0) > settings.bulk_max_bytes:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.bulk_max_bytes:
+            raise too_large
+
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if len(items) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_items} items per request"
+        )
+    return items
+
+
+@app.post("/api/v1/expenses/bulk", response_model=schemas.BulkExpenseResult)
+def bulk_create_expenses(
+    items: list = Depends(bulk_payload),
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    results = []
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schemas.ExpenseCreate.model_validate(item)))
+        except ValidationError as exc:
+            results.append(schemas.BulkItemResult(
+                index=index,
+                status="invalid",
+                errors=schemas.error_details(exc)
+            ))
+
+    created = crud.bulk_create_expenses(db, [item for _, item in valid], current_user.id)
+    results.extend(
+        schemas.BulkItemResult(index=index, status="created", id=expense_id)
+        for (index, _), expense_id in zip(valid, created)
+    )
+    results.sort(key=lambda r: r.index)
+
+    return schemas.BulkExpenseResult(
+        created=len(created),
+        failed=len(items) - len(created),
+        results=results
+    )
+
+
+@app.post("/api/v1/expenses/import", response_model=schemas.ImportResult)
+async def import_expenses(
+    request: Request,
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    stream = request.stream()
+
+    # The import runs in a worker thread and pulls the upload from the
+    # event loop one chunk at a time, so the body is never buffered whole.
+    def chunks():
+        while True:
+            try:
+                yield anyio.from_thread.run(stream.__anext__)
+            except StopAsyncIteration:
+                return
+
+    try:
+        return await run_in_threadpool(imports.import_csv, db, current_user.id, chunks())
+    except imports.MalformedCSV as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.get("/api/v1/expenses", response_model=schemas.PaginatedExpenses)
 def list_expenses(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    estimate_total: bool = False,
     category: Optional[schemas.ExpenseCategory] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
+    version = crud.get_data_version(db, current_user.id)
+    etag = make_etag(
+        current_user.id, version, page, per_page, cursor,
+        include_total, estimate_total, category, start_date, end_date
+    )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Planner estimates are only meaningful for a user's whole history.
+    total_kind = schemas.TotalKind.EXACT
+    if not include_total:
+        total_kind = schemas.TotalKind.OMITTED
+    elif estimate_total and not (category or start_date or end_date):
+        total_kind = schemas.TotalKind.ESTIMATED
+
     skip = (page - 1) * per_page
-    expenses, total = crud.get_expenses(
+    expenses, total, has_more = crud.get_expenses(
         db, current_user.id, skip=skip, limit=per_page,
-        category=category, start_date=start_date, end_date=end_date
+        category=category, start_date=start_date, end_date=end_date,
+        cursor=after, total_kind=total_kind
     )
 
-    total_pages = (total + per_page - 1) // per_page
+    total_pages = None
+    if total is not None:
+        total_pages = (total + per_page - 1) // per_page
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(expenses[-1].date, expenses[-1].id)
 
-    return schemas.PaginatedExpenses(
-        data=[schemas.ExpenseOut.model_validate(e) for e in expenses],
-        meta=schemas.PaginationMeta(
-            page=page,
-            per_page=per_page,
-            total=total,
-            total_pages=total_pages
-        )
+    meta = schemas.PaginationMeta(
+        page=None if cursor else page,
+        per_page=per_page,
+        total=total,
+        total_pages=total_pages,
+        total_kind=total_kind,
+        has_more=has_more,
+        next_cursor=next_cursor
+    )
+
+    # response_model stays for the schema, but returning a response directly
+    # skips FastAPI's second validation pass over every row.
+    return FastJSONResponse(
+        {"data": expense_rows(expenses), "meta": meta.model_dump(mode="json")},
+        headers={"ETag": etag}
+    )
+
+
+@app.get("/api/v1/expenses/export")
+def export_expenses(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    category: Optional[schemas.ExpenseCategory] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    batches = crud.iter_expenses(
+        db, current_user.id,
+        category=category, start_date=start_date, end_date=end_date
+    )
+    if export_format == "csv":
+        body, media_type = exports.csv_chunks(batches), "text/csv"
+    else:
+        body, media_type = exports.ndjson_chunks(batches), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="expenses.{export_format}"'}
     )
 
 
 @app.get("/api/v1/expenses/{expense_id}", response_model=schemas.ExpenseOut)
 def get_expense(
     expense_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     expense = crud.get_expense(db, expense_id, current_user.id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
+
+    etag = make_etag(expense.id, expense.updated_at.isoformat())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return expense
 
 
@@ -72,33 +315,108 @@ def get_expense(
 def update_expense(
     expense_id: UUID,
     expense_in: schemas.ExpenseUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    expense = crud.get_expense(db, expense_id, current_user.id)
+    expense = crud.update_expense_by_id(db, expense_id, current_user.id, expense_in)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return crud.update_expense(db, expense, expense_in)
+    return expense
 
 
 @app.delete("/api/v1/expenses/{expense_id}", status_code=204)
 def delete_expense(
     expense_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_user_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    expense = crud.get_expense(db, expense_id, current_user.id)
-    if not expense:
+    if not crud.delete_expense_by_id(db, expense_id, current_user.id):
         raise HTTPException(status_code=404, detail="Expense not found")
-    crud.delete_expense(db, expense)
     return None
 
 
 @app.get("/api/v1/summary/monthly", response_model=schemas.MonthlySummary)
 def monthly_summary(
+    response: Response,
     year: int = Query(..., ge=2000, le=2100),
     month: int = Query(..., ge=1, le=12),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    return crud.get_monthly_summary(db, current_user.id, year, month)
+    version = crud.get_data_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, year, month)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return crud.get_monthly_summary(db, current_user.id, year, month, version)
+
+
+@app.get("/api/v1/summary/series", response_model=schemas.SummarySeries)
+def summary_series(
+    response: Response,
+    start: date,
+    end: date,
+    bucket: schemas.SeriesBucket = schemas.SeriesBucket.MONTH,
+    by: Optional[Literal["category"]] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if crud.bucket_count(start, end, bucket) > settings.summary_series_max_buckets:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.summary_series_max_buckets} buckets per request"
+        )
+
+    version = crud.get_data_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, start, end, bucket, by)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return crud.get_summary_series(
+        db, current_user.id, start, end, bucket, by_category=by == "category"
+    )
+
+
+@app.get("/api/v1/analytics", response_model=schemas.Analytics)
+def spending_analytics(
+    response: Response,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    z_threshold: float = Query(3.0, gt=0),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    max_days = settings.summary_series_max_buckets
+    if start and end and (end - start).days + 1 > max_days:
+        raise HTTPException(status_code=400, detail=f"At most {max_days} days per request")
+
+    version = crud.get_data_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, start, end, z_threshold)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    try:
+        return analytics.get_analytics(db, current_user.id, start, end, z_threshold, max_days)
+    except analytics.RangeTooLarge as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.get("/internal/pool", include_in_schema=False, dependencies=[Depends(require_internal_token)])
+def pool_status():
+    return {"database": pool_stats(engine)}
+
+
+@app.get("/internal/cache", include_in_schema=False, dependencies=[Depends(require_internal_token)])
+def cache_status():
+    return {"auth": api_key_cache.stats(), "summary": summary_cache.stats()}
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_internal_token)])
+def metrics():
+    registry.refresh_gauges()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,311 @@
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from threading import Lock
+from typing import Callable, Iterator, Optional
+
+from app.auth import api_key_cache
+from app.config import settings
+from app.database import engine, pool_stats
+
+_HEADER = 8
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+_BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+_STATEMENT_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def _key(name: str, labels: tuple) -> str:
+    return json.dumps([name, labels], separators=(",", ":"))
+
+
+def _read_entries(data, used: int) -> Iterator[tuple[str, float, int]]:
+    pos = _HEADER
+    while pos < used:
+        size, = struct.unpack_from("i", data, pos)
+        pos += 4
+        key = bytes(data[pos:pos + size]).decode()
+        pos += size + (-(pos + size) % 8)
+        value, = struct.unpack_from("d", data, pos)
+        yield key, value, pos
+        pos += 8
+
+
+class MemoryStore:
+    def __init__(self):
+        self._values: dict[str, float] = {}
+
+    def add(self, key: str, amount: float) -> None:
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key: str, value: float) -> None:
+        self._values[key] = value
+
+    def items(self) -> Iterator[tuple[str, float]]:
+        return iter(list(self._values.items()))
+
+
+class MmapStore:
+    """Append-only key -> float map in a memory-mapped file.
+
+    Each process writes only its own file, so updates are plain in-place
+    stores; readers in other processes parse the file without locking.
+    """
+
+    def __init__(self, path: str, initial_size: int = 64 * 1024):
+        self.path = path
+        self._file = open(path, "a+b")
+        size = max(os.fstat(self._file.fileno()).st_size, initial_size)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = struct.unpack_from("i", self._map, 0)[0] or _HEADER
+        self._positions = {key: pos for key, _, pos in _read_entries(self._map, self._used)}
+
+    def _position(self, key: str) -> int:
+        pos = self._positions.get(key)
+        if pos is not None:
+            return pos
+
+        encoded = key.encode()
+        entry = struct.pack("i", len(encoded)) + encoded
+        entry += b"\x00" * (-(self._used + len(entry)) % 8) + struct.pack("d", 0.0)
+        if self._used + len(entry) > len(self._map):
+            size = 2 * max(len(self._map), self._used + len(entry))
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        # Publish the entry only once it is fully written.
+        struct.pack_into("i", self._map, 0, self._used)
+        pos = self._positions[key] = self._used - 8
+        return pos
+
+    def add(self, key: str, amount: float) -> None:
+        pos = self._position(key)
+        value, = struct.unpack_from("d", self._map, pos)
+        struct.pack_into("d", self._map, pos, value + amount)
+
+    def set(self, key: str, value: float) -> None:
+        struct.pack_into("d", self._map, self._position(key), value)
+
+    def items(self) -> Iterator[tuple[str, float]]:
+        return ((key, value) for key, value, _ in _read_entries(self._map, self._used))
+
+    @staticmethod
+    def read(path: str) -> Iterator[tuple[str, float]]:
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER:
+            return iter(())
+        used = min(struct.unpack_from("i", data, 0)[0], len(data))
+        return ((key, value) for key, value, _ in _read_entries(data, used))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    """Counters, histograms and gauges, aggregated across worker processes.
+
+    With a ``directory`` each process keeps its own mmap files there and a
+    scrape from any worker sums them; without one the values live in memory.
+    Counter files outlive their process so totals never go backwards, which
+    means the directory should be emptied when the service is redeployed.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._families: dict[str, tuple[str, str, tuple]] = {}
+        self._gauge_sources: list[Callable[[], dict[str, float]]] = []
+        self._lock = Lock()
+        self._pid: Optional[int] = None
+        self._gauges_refreshed = 0.0
+
+    def counter(self, name: str, help: str) -> None:
+        self._families[name] = ("counter", help, ())
+
+    def histogram(self, name: str, help: str, buckets: tuple) -> None:
+        self._families[name] = ("histogram", help, tuple(buckets) + (math.inf,))
+
+    def gauge(self, name: str, help: str) -> None:
+        self._families[name] = ("gauge", help, ())
+
+    def gauge_source(self, source: Callable[[], dict[str, float]]) -> None:
+        self._gauge_sources.append(source)
+
+    def _stores(self):
+        # Opened lazily, and reopened after a fork, so each worker writes
+        # to files named after its own pid.
+        pid = os.getpid()
+        if self._pid != pid:
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+                self._counters = MmapStore(os.path.join(self.directory, f"counters_{pid}.db"))
+                self._gauges = MmapStore(os.path.join(self.directory, f"gauges_{pid}.db"))
+            else:
+                self._counters, self._gauges = MemoryStore(), MemoryStore()
+            self._pid = pid
+        return self._counters, self._gauges
+
+    def inc(self, name: str, labels: tuple, amount: float = 1.0) -> None:
+        with self._lock:
+            counters, _ = self._stores()
+            counters.add(_key(name, labels), amount)
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        buckets = self._families[name][2]
+        # Buckets are stored individually and made cumulative on render,
+        # so an observation is three writes however many buckets there are.
+        le = next(b for b in buckets if value <= b)
+        with self._lock:
+            counters, _ = self._stores()
+            counters.add(_key(name + "_bucket", labels + (("le", le),)), 1.0)
+            counters.add(_key(name + "_sum", labels), value)
+            counters.add(_key(name + "_count", labels), 1.0)
+
+    def refresh_gauges(self, min_interval: float = 0.0) -> None:
+        now = time.monotonic()
+        if now - self._gauges_refreshed < min_interval:
+            return
+        self._gauges_refreshed = now
+        values = {}
+        for source in self._gauge_sources:
+            values.update(source())
+        with self._lock:
+            _, gauges = self._stores()
+            for name, value in values.items():
+                gauges.set(_key(name, ()), float(value))
+
+    def collect(self) -> dict[tuple[str, tuple], float]:
+        with self._lock:
+            counters, gauges = self._stores()
+            local = [("counter", os.getpid(), counters.items()), ("gauge", os.getpid(), gauges.items())]
+
+        sources = local
+        if self.directory:
+            sources = []
+            for path in glob.glob(os.path.join(self.directory, "*.db")):
+                kind, _, pid = os.path.basename(path)[:-3].rpartition("_")
+                pid = int(pid)
+                if kind == "gauges" and not _pid_alive(pid):
+                    continue
+                sources.append((kind[:-1], pid, MmapStore.read(path)))
+
+        samples: dict[tuple[str, tuple], float] = {}
+        for kind, pid, items in sources:
+            for key, value in items:
+                name, labels = json.loads(key)
+                labels = tuple(tuple(pair) for pair in labels)
+                if kind == "gauge":
+                    labels += (("pid", str(pid)),)
+                samples[(name, labels)] = samples.get((name, labels), 0.0) + value
+        return samples
+
+    def render(self) -> str:
+        samples = self.collect()
+        lines = []
+        for name, (kind, help, buckets) in self._families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind != "histogram":
+                for (sample, labels), value in sorted(samples.items()):
+                    if sample == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+
+            series = sorted({labels for sample, labels in samples if sample == name + "_count"})
+            for labels in series:
+                cumulative = 0.0
+                for le in buckets:
+                    cumulative += samples.get((name + "_bucket", labels + (("le", le),)), 0.0)
+                    lines.append(
+                        f"{name}_bucket{_labels(labels + (('le', _number(le)),))} {_number(cumulative)}"
+                    )
+                lines.append(f"{name}_sum{_labels(labels)} {_number(samples[(name + '_sum', labels)])}")
+                lines.append(f"{name}_count{_labels(labels)} {_number(samples[(name + '_count', labels)])}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in labels
+    )
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+registry = Registry(settings.metrics_dir)
+registry.counter("http_requests_total", "Requests handled, by route and status.")
+registry.histogram(
+    "http_request_duration_seconds", "Request latency, by route and status.", _LATENCY_BUCKETS
+)
+registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency, by statement kind.", _QUERY_BUCKETS
+)
+registry.histogram(
+    "group_commit_batch_size", "Rows written per group commit.", _BATCH_BUCKETS
+)
+
+POOL_GAUGES = {
+    "size": "Connections the pool keeps open.",
+    "checked_in": "Idle connections in the pool.",
+    "checked_out": "Connections currently in use.",
+    "overflow": "Connections opened beyond the pool size.",
+    "checkouts": "Checkouts since the process started.",
+    "timeouts": "Checkouts that timed out since the process started.",
+    "wait_avg_ms": "Mean checkout wait in milliseconds.",
+    "wait_max_ms": "Longest checkout wait in milliseconds.",
+}
+AUTH_CACHE_GAUGES = {
+    "size": "API keys currently cached.",
+    "hits": "Auth cache hits since the process started.",
+    "misses": "Auth cache misses since the process started.",
+    "evictions": "Auth cache evictions since the process started.",
+    "hit_ratio": "Auth cache hits over lookups.",
+}
+
+for _stat, _help in POOL_GAUGES.items():
+    registry.gauge(f"db_pool_{_stat}", _help)
+for _stat, _help in AUTH_CACHE_GAUGES.items():
+    registry.gauge(f"auth_cache_{_stat}", _help)
+registry.gauge_source(
+    lambda: {f"db_pool_{k}": v for k, v in pool_stats(engine).items() if k in POOL_GAUGES}
+)
+registry.gauge_source(
+    lambda: {f"auth_cache_{k}": v for k, v in api_key_cache.stats().items() if k in AUTH_CACHE_GAUGES}
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    labels = (("method", method), ("route", route), ("status", str(status)))
+    registry.inc("http_requests_total", labels)
+    registry.observe("http_request_duration_seconds", labels, seconds)
+    registry.refresh_gauges(min_interval=1.0)
+
+
+def observe_query(statement: str, seconds: float) -> None:
+    kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if kind not in _STATEMENT_KINDS:
+        kind = "OTHER"
+    registry.observe("db_query_duration_seconds", (("statement", kind),), seconds)
@@ -3,7 +3,10 @@ from datetime import datetime
 from decimal import Decimal
 from enum import Enum as PyEnum
 
-from sqlalchemy import Column, String, DateTime, Date, Numeric, ForeignKey, Enum
+from sqlalchemy import (
+    DDL, Boolean, Column, String, Text, DateTime, Date, Numeric, Integer, BigInteger, ForeignKey, Enum, Index,
+    event, false
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -26,6 +29,11 @@ class User(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     api_key = Column(String(64), unique=True, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every expense write; lists and summaries derive ETags from it.
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Set on the primary's directory row while the user's data lives on
+    # another shard, so writes that still reach the primary fail.
+    data_moved = Column(Boolean, nullable=False, default=False, server_default=false())
 
     expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan")
 
@@ -34,12 +42,52 @@ class Expense(Base):
     __tablename__ = "expenses"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     category = Column(Enum(ExpenseCategory), nullable=False)
     description = Column(String(255), nullable=True)
-    date = Column(Date, nullable=False)
+    # Range-partitioned by date (see app.partitions). Postgres requires the
+    # partition key in the primary key, but the ORM keeps identifying rows
+    # by id alone so an instance survives a change of date.
+    date = Column(Date, primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User", back_populates="expenses")
+
+    __table_args__ = (
+        Index("ix_expenses_user_date_id", user_id, date.desc(), id.desc()),
+        Index("ix_expenses_user_category_date", user_id, category, date),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+
+event.listen(
+    Expense.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS expenses_default PARTITION OF expenses DEFAULT")
+)
+
+
+class ExpenseRollup(Base):
+    __tablename__ = "expense_rollups"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    period = Column(Date, primary_key=True)
+    category = Column(Enum(ExpenseCategory), primary_key=True)
+    total = Column(Numeric(14, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    # Counts rows in a detached partition, which rebuilds can't see again.
+    archived = Column(Boolean, nullable=False, default=False, server_default=false())
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
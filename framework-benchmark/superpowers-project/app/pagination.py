@@ -0,0 +1,19 @@
+import base64
+import binascii
+from datetime import date
+from uuid import UUID
+
+
+def encode_cursor(expense_date: date, expense_id: UUID) -> str:
+    raw = f"{expense_date.isoformat()}|{expense_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, UUID]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.split("|")
+        return date.fromisoformat(date_part), UUID(id_part)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
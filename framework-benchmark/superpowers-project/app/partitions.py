@@ -0,0 +1,179 @@
+import argparse
+import re
+from datetime import date
+from typing import Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+PARENT = "expenses"
+DEFAULT_PARTITION = "expenses_default"
+
+# Serializes partition changes across workers and shards' maintenance runs.
+_LOCK_KEY = 0x6578705F70617274  # "exp_part"
+
+_BOUNDS = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+Executor = Union[Session, Connection]
+
+
+def period_start(day: date, interval: str) -> date:
+    if interval == "year":
+        return date(day.year, 1, 1)
+    return day.replace(day=1)
+
+
+def next_period(day: date, interval: str) -> date:
+    if interval == "year":
+        return date(day.year + 1, 1, 1)
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(start: date, interval: str) -> str:
+    if interval == "year":
+        return f"{PARENT}_p{start.year}"
+    return f"{PARENT}_p{start.year}_{start.month:02d}"
+
+
+def list_partitions(db: Executor) -> dict[str, Optional[tuple[date, date]]]:
+    # Range partitions map to their [start, end) bounds; the default to None.
+    rows = db.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:parent AS regclass)
+    """), {"parent": PARENT}).all()
+    partitions = {}
+    for name, bound in rows:
+        match = _BOUNDS.search(bound)
+        partitions[name] = (
+            (date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2)))
+            if match else None
+        )
+    return partitions
+
+
+def create_default_partition(db: Executor) -> None:
+    # Rows outside every range land here, so a missing partition can only
+    # cost pruning, never a failed insert.
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+
+def _create_partition(db: Executor, name: str, start: date, end: date) -> None:
+    params = {"start": start, "end": end}
+    stranded = db.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end)"
+    ), params).scalar()
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    if not stranded:
+        db.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES {bounds}"))
+        return
+
+    # Postgres refuses a new range while the default partition still holds
+    # rows for it, so build the partition detached, move them, then attach.
+    db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), params)
+    db.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+
+def ensure_partitions(
+    db: Executor,
+    start: date,
+    end: date,
+    interval: Optional[str] = None
+) -> list[str]:
+    """Create the range partitions covering ``start`` through ``end``.
+
+    Periods already covered by an existing partition are skipped, so this
+    is safe to run repeatedly. Concurrent callers queue on an advisory lock
+    held until the caller commits, then see each other's partitions.
+    """
+    interval = interval or settings.expense_partition_interval
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+    existing = [bounds for bounds in list_partitions(db).values() if bounds]
+    created = []
+    day = period_start(start, interval)
+    while day <= end:
+        upper = next_period(day, interval)
+        if not any(lo < upper and hi > day for lo, hi in existing):
+            name = partition_name(day, interval)
+            _create_partition(db, name, day, upper)
+            existing.append((day, upper))
+            created.append(name)
+        day = upper
+    return created
+
+
+def ensure_upcoming(db: Executor, today: Optional[date] = None) -> list[str]:
+    interval = settings.expense_partition_interval
+    day = period_start(today or date.today(), interval)
+    end = day
+    for _ in range(settings.expense_partitions_ahead):
+        end = next_period(end, interval)
+    return ensure_partitions(db, day, end, interval)
+
+
+def detach_partitions(db: Executor, before: date) -> list[str]:
+    """Detach every range partition that ends on or before ``before``.
+
+    Detached partitions stay behind as plain tables to dump and drop at
+    leisure. Their rollups are marked archived and kept, also through
+    rebuilds and shard moves, so monthly summaries and whole-month series
+    still cover the archived periods. Anything that scans expenses (lists,
+    exports, analytics, partial-month series) no longer sees those rows.
+    The caller commits.
+    """
+    detached = []
+    for name, bounds in sorted(list_partitions(db).items()):
+        if bounds is None or bounds[1] > before:
+            continue
+        db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        db.execute(text(
+            "UPDATE expense_rollups SET archived = true WHERE period >= :start AND period < :end"
+        ), {"start": bounds[0], "end": bounds[1]})
+        # Their rows vanish from lists, so cached list ETags must move.
+        db.execute(text(
+            f"UPDATE users SET data_version = data_version + 1 "
+            f"WHERE id IN (SELECT DISTINCT user_id FROM {name})"
+        ))
+        detached.append(name)
+    return detached
+
+
+def main() -> None:
+    from app.shards import shard_map
+
+    parser = argparse.ArgumentParser(description="Maintain the expenses table partitions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ensure_cmd = sub.add_parser("ensure", help="create partitions for upcoming periods")
+    ensure_cmd.add_argument("--start", type=date.fromisoformat, help="also cover periods from this date")
+    detach_cmd = sub.add_parser("detach", help="detach partitions for archival")
+    detach_cmd.add_argument("--before", type=date.fromisoformat, required=True)
+    args = parser.parse_args()
+
+    for shard in shard_map.names:
+        db = shard_map.session(shard)
+        try:
+            if args.command == "ensure":
+                names = ensure_upcoming(db)
+                if args.start:
+                    names += ensure_partitions(db, args.start, date.today())
+                verb = "created"
+            else:
+                names = detach_partitions(db, args.before)
+                verb = "detached"
+            db.commit()
+        finally:
+            db.close()
+        print(f"{verb} {len(names)} partitions on {shard}" + (f": {', '.join(names)}" if names else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import itertools
+from threading import Lock
+from typing import Callable, Iterable, Optional
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.auth import CurrentUser, get_current_user
+from app.cache import TTLCache
+from app.config import settings
+from app.database import build_engine
+from app.shards import PRIMARY, get_user_db, shard_map
+
+
+class ReadRouter:
+    """Sends a user's reads to a replica unless they wrote recently.
+
+    After a write the user is pinned to the primary for ``sticky_seconds``
+    so they always see their own changes; the window should comfortably
+    exceed normal replication lag. Pins live in this process only, so a
+    multi-worker deployment should also keep the window above the time a
+    client takes to land on another worker.
+    """
+
+    def __init__(
+        self,
+        session_factories: list[Callable[[], Session]],
+        sticky_seconds: float = 5.0,
+        max_pinned: int = 100_000
+    ):
+        self.session_factories = session_factories
+        self._cycle = itertools.cycle(session_factories)
+        self._lock = Lock()
+        self.pinned = TTLCache(max_size=max_pinned, ttl=sticky_seconds)
+
+    def mark_written(self, user_ids: Iterable[UUID]) -> None:
+        if not self.session_factories:
+            return
+        for user_id in user_ids:
+            self.pinned.set(user_id, True)
+
+    def replica_session(self, user_id: UUID) -> Optional[Session]:
+        if not self.session_factories or self.pinned.get(user_id) is not None:
+            return None
+        with self._lock:
+            factory = next(self._cycle)
+        session = factory()
+        session.info["replica"] = True
+        return session
+
+
+replica_engines = [build_engine(url) for url in settings.read_replica_urls]
+read_router = ReadRouter(
+    [
+        sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=replica)
+        for replica in replica_engines
+    ],
+    sticky_seconds=settings.read_your_writes_seconds
+)
+
+
+def is_replica(db: Session) -> bool:
+    return bool(db.info.get("replica"))
+
+
+def get_read_db(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_user_db)
+):
+    # The shard session is only a fallback; it never connects unless used.
+    # Replicas mirror the primary, so users on other shards read their own.
+    replica = None
+    if shard_map.shard_for(current_user.id) == PRIMARY:
+        replica = read_router.replica_session(current_user.id)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica.close()
@@ -0,0 +1,180 @@
+import argparse
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import event, inspect, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app import summary_cache
+from app.replicas import read_router
+from app.shards import UserMoved
+from app.models import Expense, ExpenseCategory, ExpenseRollup, User
+
+RollupKey = tuple[UUID, date, ExpenseCategory]
+Deltas = dict[RollupKey, list]
+
+
+def period_of(day: date) -> date:
+    return day.replace(day=1)
+
+
+def new_deltas() -> Deltas:
+    return defaultdict(lambda: [Decimal("0"), 0])
+
+
+def add_delta(
+    deltas: Deltas,
+    user_id: UUID,
+    day: date,
+    category: ExpenseCategory,
+    amount: Decimal,
+    sign: int = 1
+) -> None:
+    entry = deltas[(user_id, period_of(day), category)]
+    entry[0] += sign * Decimal(amount)
+    entry[1] += sign
+
+
+def apply_deltas(db: Session, deltas: Deltas) -> None:
+    # Every expense write lands here, so this is also where the per-user
+    # data version moves, even when the rollups themselves net to zero.
+    user_ids = {key[0] for key in deltas}
+    if user_ids:
+        # Also the fence for shard moves: a user moved off this database
+        # has no row here, or a data_moved one, so the write rolls back.
+        bumped = db.connection().execute(
+            update(User)
+            .where(User.id.in_(user_ids), User.data_moved.is_(False))
+            .values(data_version=User.data_version + 1)
+            .returning(User.id)
+        ).scalars().all()
+        if len(bumped) < len(user_ids):
+            raise UserMoved(f"Data for user {min(user_ids - set(bumped))} has moved to another shard")
+        read_router.mark_written(user_ids)
+
+    rows = [
+        {"user_id": key[0], "period": key[1], "category": key[2], "total": total, "count": count}
+        for key, (total, count) in deltas.items()
+        if count or total
+    ]
+    if not rows:
+        return
+
+    table = ExpenseRollup.__table__
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.period, table.c.category],
+        set_={
+            "total": table.c.total + stmt.excluded.total,
+            "count": table.c.count + stmt.excluded.count,
+        }
+    )
+    # Go through the connection so this is safe to call mid-flush.
+    conn = db.connection()
+    conn.execute(stmt)
+    conn.execute(
+        table.delete().where(
+            tuple_(table.c.user_id, table.c.period, table.c.category).in_(
+                [(r["user_id"], r["period"], r["category"]) for r in rows]
+            ),
+            table.c.count <= 0
+        )
+    )
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+    return value
+
+
+# The flush hook needs pre-update values even when a commit has expired the
+# instance; active_history makes the ORM load them on assignment.
+for _attr in (Expense.user_id, Expense.amount, Expense.category, Expense.date):
+    event.listen(_attr, "set", _keep_previous, active_history=True, retval=True)
+
+
+def _previous(state, attr: str):
+    history = state.attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(state.object, attr)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_rollups(session: Session, flush_context) -> None:
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    deltas = new_deltas()
+
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            add_delta(deltas, obj.user_id, obj.date, obj.category, obj.amount)
+
+    for obj in session.deleted:
+        if isinstance(obj, Expense) and obj.user_id not in deleted_users:
+            add_delta(deltas, obj.user_id, obj.date, obj.category, obj.amount, -1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Expense) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        add_delta(
+            deltas,
+            _previous(state, "user_id"), _previous(state, "date"),
+            _previous(state, "category"), _previous(state, "amount"), -1
+        )
+        add_delta(deltas, obj.user_id, obj.date, obj.category, obj.amount)
+
+    apply_deltas(session, deltas)
+
+
+def recompute(db: Session, user_id: Optional[UUID] = None) -> int:
+    # Takes no locks: the caller keeps writers out, as rebuild does with a
+    # table lock and shards.move_user with the user row.
+    where = "WHERE user_id = :user_id" if user_id else ""
+    params = {"user_id": user_id} if user_id else {}
+    # Archived rollups count rows that are no longer in expenses, so they
+    # are kept as they are; writes since the detach already updated them.
+    kept = "NOT archived" + (" AND user_id = :user_id" if user_id else "")
+    db.execute(text(f"DELETE FROM expense_rollups WHERE {kept}"), params)
+    result = db.execute(text(f"""
+        INSERT INTO expense_rollups (user_id, period, category, total, count)
+        SELECT user_id, date_trunc('month', date)::date, category, sum(amount), count(*)
+        FROM expenses {where}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, period, category) DO NOTHING
+    """), params)
+    return result.rowcount
+
+
+def rebuild(db: Session, user_id: Optional[UUID] = None) -> int:
+    # EXCLUSIVE waits out in-flight writers and blocks new rollup updates
+    # until the rebuilt rows commit, so nothing is double counted.
+    db.execute(text("LOCK TABLE expense_rollups IN EXCLUSIVE MODE"))
+    rows = recompute(db, user_id)
+    db.commit()
+    summary_cache.summary_cache.clear()
+    return rows
+
+
+def main() -> None:
+    from app.shards import shard_map
+
+    parser = argparse.ArgumentParser(description="Maintain the expense_rollups table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_cmd = sub.add_parser("rebuild", help="recompute rollups from expenses")
+    rebuild_cmd.add_argument("--user-id", type=UUID, help="only rebuild this user's rows")
+    args = parser.parse_args()
+
+    shards = [shard_map.shard_for(args.user_id)] if args.user_id else shard_map.names
+    for shard in shards:
+        db = shard_map.session(shard)
+        try:
+            rows = rebuild(db, args.user_id)
+        finally:
+            db.close()
+        print(f"rebuilt {rows} rollup rows on {shard}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Annotated, Any, Literal, Optional
 from uuid import UUID
 from enum import Enum
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+# Alias so fields named ``date`` don't shadow the type in their own annotation.
+DateType = date
+# Bounded like the Numeric(10, 2) column, so an oversized amount fails
+# validation instead of the insert.
+Amount = Annotated[Decimal, Field(gt=0, max_digits=10, decimal_places=2)]
 
 
 class ExpenseCategory(str, Enum):
@@ -18,7 +24,7 @@ class ExpenseCategory(str, Enum):
 
 
 class ExpenseBase(BaseModel):
-    amount: Decimal = Field(..., gt=0, description="Amount must be greater than 0")
+    amount: Amount = Field(..., description="Amount must be greater than 0")
     category: ExpenseCategory
     description: Optional[str] = Field(None, max_length=255)
     date: date
@@ -43,10 +49,10 @@ class ExpenseCreate(ExpenseBase):
 
 
 class ExpenseUpdate(BaseModel):
-    amount: Optional[Decimal] = Field(None, gt=0)
+    amount: Optional[Amount] = None
     category: Optional[ExpenseCategory] = None
     description: Optional[str] = Field(None, max_length=255)
-    date: Optional[date] = None
+    date: Optional[DateType] = None
 
     @field_validator('amount')
     @classmethod
@@ -71,11 +77,20 @@ class ExpenseOut(ExpenseBase):
     updated_at: datetime
 
 
+class TotalKind(str, Enum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    OMITTED = "omitted"
+
+
 class PaginationMeta(BaseModel):
-    page: int
+    page: Optional[int] = None
     per_page: int
-    total: int
-    total_pages: int
+    total: Optional[int] = None
+    total_pages: Optional[int] = None
+    total_kind: TotalKind = TotalKind.EXACT
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 class PaginatedExpenses(BaseModel):
@@ -83,6 +98,35 @@ class PaginatedExpenses(BaseModel):
     meta: PaginationMeta
 
 
+class BulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "invalid"]
+    id: Optional[UUID] = None
+    errors: Optional[list[dict[str, Any]]] = None
+
+
+class BulkExpenseResult(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkItemResult]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: list[dict[str, Any]]
+
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
+    errors_truncated: bool = False
+
+
+def error_details(exc: ValidationError) -> list[dict[str, Any]]:
+    return [{"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]} for e in exc.errors()]
+
+
 class MonthlySummaryItem(BaseModel):
     category: ExpenseCategory
     total: Decimal
@@ -93,3 +137,65 @@ class MonthlySummary(BaseModel):
     month: int
     categories: list[MonthlySummaryItem]
     grand_total: Decimal
+
+
+class SeriesBucket(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class SeriesValues(BaseModel):
+    totals: list[Decimal]
+    counts: list[int]
+
+
+class SummarySeries(BaseModel):
+    start: date
+    end: date
+    bucket: SeriesBucket
+    # Bucket start dates; totals/counts line up with them index for index.
+    buckets: list[date]
+    totals: list[Decimal]
+    counts: list[int]
+    categories: Optional[dict[ExpenseCategory, SeriesValues]] = None
+
+
+class AnalyticsDaily(BaseModel):
+    days: list[date]
+    totals: list[float]
+    rolling_7: list[float]
+    rolling_30: list[float]
+
+
+class AnalyticsMonthly(BaseModel):
+    months: list[date]
+    totals: list[float]
+    deltas: list[Optional[float]]
+    pct_changes: list[Optional[float]]
+
+
+class CategoryPercentiles(BaseModel):
+    count: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+
+
+class AnalyticsAnomaly(BaseModel):
+    id: UUID
+    date: DateType
+    category: ExpenseCategory
+    amount: float
+    z_score: float
+
+
+class Analytics(BaseModel):
+    start: Optional[DateType]
+    end: Optional[DateType]
+    count: int
+    daily: AnalyticsDaily
+    monthly: AnalyticsMonthly
+    categories: dict[ExpenseCategory, CategoryPercentiles]
+    anomalies: list[AnalyticsAnomaly]
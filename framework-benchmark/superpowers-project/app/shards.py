@@ -0,0 +1,248 @@
+import argparse
+import bisect
+import hashlib
+from typing import Callable, Iterator, Optional
+from uuid import UUID, uuid4
+
+from fastapi import Depends
+from sqlalchemy import case, delete, select, union, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.auth import CurrentUser, get_current_user
+from app.config import settings
+from app.database import SessionLocal, build_engine, get_db
+from app.models import Expense, ExpenseRollup, IdempotencyKey, User
+
+# The primary database is always a shard, and its users table is also
+# the directory that API keys are authenticated against.
+PRIMARY = "primary"
+
+
+class UserMoved(Exception):
+    pass
+
+
+def _point(value: bytes) -> int:
+    return int.from_bytes(hashlib.md5(value).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing of user ids onto shard names.
+
+    Each shard owns ``vnodes`` points on the ring, so adding or removing a
+    shard only moves the users between its points and their neighbours,
+    roughly 1/N of them.
+    """
+
+    def __init__(self, names: list[str], vnodes: int = 64):
+        points = sorted((_point(f"{name}#{i}".encode()), name) for name in names for i in range(vnodes))
+        self._points = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    def lookup(self, user_id: UUID) -> str:
+        index = bisect.bisect(self._points, _point(user_id.bytes)) % len(self._points)
+        return self._names[index]
+
+
+class ShardMap:
+    def __init__(self, session_factories: dict[str, Callable[[], Session]], vnodes: int = 64):
+        self.session_factories = session_factories
+        self.ring = HashRing(sorted(session_factories), vnodes)
+
+    @property
+    def names(self) -> list[str]:
+        return sorted(self.session_factories)
+
+    def shard_for(self, user_id: UUID) -> str:
+        if len(self.session_factories) == 1:
+            return next(iter(self.session_factories))
+        return self.ring.lookup(user_id)
+
+    def session(self, name: str) -> Session:
+        return self.session_factories[name]()
+
+
+shard_engines = {name: build_engine(url) for name, url in settings.shard_urls.items()}
+shard_map = ShardMap(
+    {
+        PRIMARY: SessionLocal,
+        **{
+            name: sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=shard)
+            for name, shard in shard_engines.items()
+        },
+    },
+    vnodes=settings.shard_virtual_nodes
+)
+
+
+def get_user_db(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    shard = shard_map.shard_for(current_user.id)
+    if shard == PRIMARY:
+        yield db
+        return
+    session = shard_map.session(shard)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def create_user(api_key: str, shards: Optional[ShardMap] = None) -> UUID:
+    # The directory row authenticates the user; the copy on their shard
+    # satisfies the foreign keys there.
+    shards = shards or shard_map
+    user_id = uuid4()
+    owner = shards.shard_for(user_id)
+    for name in sorted({PRIMARY, owner}):
+        with shards.session(name) as db:
+            db.add(User(id=user_id, api_key=api_key, data_moved=name != owner))
+            db.commit()
+    return user_id
+
+
+_DATA_TABLES = (Expense.__table__, IdempotencyKey.__table__)
+
+
+def resident_users(db: Session, shard: str) -> list[UUID]:
+    # Users with data on this shard; elsewhere every user row counts too,
+    # since only the primary keeps rows for users it does not own.
+    sources = [select(table.c.user_id) for table in _DATA_TABLES + (ExpenseRollup.__table__,)]
+    if shard != PRIMARY:
+        sources.append(select(User.id))
+    return list(db.scalars(union(*sources)))
+
+
+def misplaced_users(shards: ShardMap, shard: str) -> Iterator[tuple[UUID, str]]:
+    with shards.session(shard) as db:
+        users = resident_users(db, shard)
+    for user_id in users:
+        target = shards.shard_for(user_id)
+        if target != shard:
+            yield user_id, target
+
+
+def move_user(
+    user_id: UUID,
+    source: str,
+    target: str,
+    shards: Optional[ShardMap] = None,
+    batch_size: int = 5000
+) -> int:
+    """Copy a user's rows from ``source`` to ``target``, then delete them.
+
+    The user row stays locked on the source for the whole copy and is then
+    deleted, or on the primary marked ``data_moved``. Every write bumps that
+    row through ``rollups.apply_deltas``, which raises ``UserMoved`` when it
+    is gone or marked, so a write still routed to the source waits for the
+    move and then rolls back instead of stranding rows there. Every step is
+    idempotent, so an interrupted move can simply be rerun.
+    """
+    from app import rollups
+
+    shards = shards or shard_map
+    src, dst = shards.session(source), shards.session(target)
+    try:
+        user = src.execute(
+            select(User.__table__).where(User.id == user_id).with_for_update()
+        ).mappings().first()
+        if user is None:
+            src.rollback()
+            return 0
+
+        stmt = insert(User.__table__).values(**{**user, "data_moved": False})
+        dst.execute(stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={"data_version": stmt.excluded.data_version + 1, "data_moved": False}
+        ))
+
+        moved = 0
+        for table in _DATA_TABLES:
+            result = src.execute(
+                select(table).where(table.c.user_id == user_id).execution_options(yield_per=batch_size)
+            )
+            for batch in result.mappings().partitions():
+                dst.execute(insert(table).on_conflict_do_nothing(), [dict(row) for row in batch])
+                moved += len(batch)
+        # Archived rollups have no rows left to rebuild them from.
+        archived = src.execute(
+            select(ExpenseRollup.__table__)
+            .where(ExpenseRollup.user_id == user_id, ExpenseRollup.archived.is_(True))
+        ).mappings().all()
+        if archived:
+            # Added to live totals from writes routed to the target, but
+            # overwriting what an earlier, interrupted run copied.
+            table = ExpenseRollup.__table__
+            stmt = insert(table)
+            dst.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.period, table.c.category],
+                set_={
+                    "total": case((table.c.archived, stmt.excluded.total), else_=table.c.total + stmt.excluded.total),
+                    "count": case((table.c.archived, stmt.excluded.count), else_=table.c.count + stmt.excluded.count),
+                    "archived": True,
+                }
+            ), [dict(row) for row in archived])
+        # The rest is recomputed rather than copied: the target may already
+        # hold rollups from writes routed there, and a rerun must not count
+        # rows twice. The locked user rows keep writers out on both sides,
+        # and the data_version bump above retires only this user's cached
+        # summaries.
+        rollups.recompute(dst, user_id)
+        dst.commit()
+
+        for table in _DATA_TABLES + (ExpenseRollup.__table__,):
+            src.execute(delete(table).where(table.c.user_id == user_id))
+        if source == PRIMARY:
+            src.execute(update(User).where(User.id == user_id).values(data_moved=True))
+        else:
+            src.execute(delete(User).where(User.id == user_id))
+        src.commit()
+        return moved
+    finally:
+        src.close()
+        dst.close()
+
+
+def rebalance(shards: Optional[ShardMap] = None, dry_run: bool = False) -> dict[tuple[str, str], int]:
+    shards = shards or shard_map
+    moves: dict[tuple[str, str], int] = {}
+    for source in shards.names:
+        for user_id, target in list(misplaced_users(shards, source)):
+            if not dry_run:
+                move_user(user_id, source, target, shards)
+            moves[(source, target)] = moves.get((source, target), 0) + 1
+    return moves
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move users between expense shards.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebalance_cmd = sub.add_parser("rebalance", help="move every user to the shard the ring assigns")
+    rebalance_cmd.add_argument("--dry-run", action="store_true", help="only count the moves")
+    move_cmd = sub.add_parser("move", help="move one user to the shard the ring assigns")
+    move_cmd.add_argument("--user-id", type=UUID, required=True)
+    move_cmd.add_argument("--from", dest="source", required=True, choices=shard_map.names)
+    args = parser.parse_args()
+
+    if args.command == "move":
+        target = shard_map.shard_for(args.user_id)
+        if target == args.source:
+            print(f"user {args.user_id} already belongs on {target}")
+            return
+        rows = move_user(args.user_id, args.source, target)
+        print(f"moved {rows} rows for user {args.user_id} from {args.source} to {target}")
+        return
+
+    moves = rebalance(dry_run=args.dry_run)
+    verb = "would move" if args.dry_run else "moved"
+    for (source, target), users in sorted(moves.items()):
+        print(f"{verb} {users} users from {source} to {target}")
+    if not moves:
+        print("every user is on its shard")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import fnmatch
+import time
+from threading import Lock
+from typing import Iterable, Iterator, Optional
+from uuid import UUID
+
+from app.cache import TTLCache
+from app.config import settings
+from app.schemas import MonthlySummary
+
+# (user_id, year, month, data_version): every write bumps the version, so
+# a summary cached for an older version is simply never looked up again.
+SummaryKey = tuple[UUID, int, int, int]
+
+
+class LocalSummaryCache:
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, key: SummaryKey) -> Optional[MonthlySummary]:
+        return self._cache.get(key)
+
+    def set(self, key: SummaryKey, summary: MonthlySummary) -> None:
+        self._cache.set(key, summary)
+
+    def invalidate(self, keys: Iterable[SummaryKey]) -> None:
+        for key in keys:
+            self._cache.invalidate(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "local", **self._cache.stats()}
+
+
+class InMemoryKV:
+    """Stand-in for a shared key-value store, exposing the redis-py calls we use."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[Optional[float], bytes]] = {}
+        self._lock = Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value, ex: Optional[float] = None) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._data[name] = (time.monotonic() + ex if ex else None, value)
+
+    def delete(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._data.pop(name, None)
+
+    def scan_iter(self, match: str, count: Optional[int] = None) -> Iterator[str]:
+        with self._lock:
+            names = [name for name in self._data if fnmatch.fnmatchcase(name, match)]
+        yield from names
+
+
+class SharedSummaryCache:
+    def __init__(self, client, ttl: float, prefix: str = "summary"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _name(self, key: SummaryKey) -> str:
+        user_id, year, month, version = key
+        return f"{self.prefix}:{user_id}:{year:04d}-{month:02d}:{version}"
+
+    def get(self, key: SummaryKey) -> Optional[MonthlySummary]:
+        raw = self.client.get(self._name(key))
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return MonthlySummary.model_validate_json(raw)
+
+    def set(self, key: SummaryKey, summary: MonthlySummary) -> None:
+        self.client.set(self._name(key), summary.model_dump_json(), ex=self.ttl)
+
+    def invalidate(self, keys: Iterable[SummaryKey]) -> None:
+        names = [self._name(key) for key in keys]
+        if names:
+            self.client.delete(*names)
+
+    def clear(self) -> None:
+        # Only our own keys: the store may be shared with other data.
+        batch = []
+        for name in self.client.scan_iter(match=f"{self.prefix}:*", count=1000):
+            batch.append(name)
+            if len(batch) >= 1000:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "shared",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def build_cache():
+    if settings.summary_cache_backend == "shared":
+        if settings.summary_cache_url:
+            # Optional dependency; only needed when a real shared store is configured.
+            import redis
+            client = redis.Redis.from_url(settings.summary_cache_url)
+        else:
+            client = InMemoryKV()
+        return SharedSummaryCache(client, ttl=settings.summary_cache_ttl_seconds)
+    return LocalSummaryCache(
+        max_size=settings.summary_cache_max_size,
+        ttl=settings.summary_cache_ttl_seconds
+    )
+
+
+summary_cache = build_cache()
+
@@ -0,0 +1,109 @@
+"""Before/after EXPLAIN for the summary and list queries.
+
+Seeds a scratch database, then prints EXPLAIN (ANALYZE, BUFFERS) for the
+old ``extract()``/single-index shape and for the half-open range
+predicates served by the composite indexes.
+
+    python -m benchmarks.explain_indexes --url postgresql+psycopg2://... --rows 500000
+"""
+import argparse
+from datetime import date
+
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.crud import month_bounds
+from app.database import Base
+from app import models  # noqa: F401
+
+CATEGORIES = "ARRAY['FOOD','FOOD','FOOD','TRANSPORT','SHOPPING','UTILITIES','ENTERTAINMENT','HEALTHCARE','OTHER']"
+
+SEED_USERS = "INSERT INTO users (id, api_key, created_at) SELECT gen_random_uuid(), 'bench_' || n, now() FROM generate_series(1, :users) n"
+
+SEED_EXPENSES = f"""
+INSERT INTO expenses (id, user_id, amount, category, description, date, created_at, updated_at)
+SELECT gen_random_uuid(), u.id, round((random() * 200)::numeric, 2),
+       ({CATEGORIES})[1 + floor(random() * 9)::int]::expensecategory,
+       NULL, current_date - (random() * 1095)::int, now(), now()
+FROM users u, generate_series(1, :per_user)
+"""
+
+OLD_INDEXES = [
+    "DROP INDEX IF EXISTS ix_expenses_user_date_id",
+    "DROP INDEX IF EXISTS ix_expenses_user_category_date",
+    "CREATE INDEX IF NOT EXISTS ix_expenses_user_id ON expenses (user_id)",
+]
+
+NEW_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_expenses_user_date_id ON expenses (user_id, date DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_expenses_user_category_date ON expenses (user_id, category, date)",
+    "DROP INDEX IF EXISTS ix_expenses_user_id",
+]
+
+BEFORE = {
+    "monthly summary": """
+        SELECT category, sum(amount) FROM expenses
+        WHERE user_id = :user_id
+          AND extract(year FROM date) = :year AND extract(month FROM date) = :month
+        GROUP BY category""",
+    "list, date filter": """
+        SELECT * FROM expenses
+        WHERE user_id = :user_id AND date >= :start AND date <= :last_day
+        ORDER BY date DESC OFFSET 0 LIMIT 21""",
+}
+
+AFTER = {
+    "monthly summary": """
+        SELECT category, sum(amount) FROM expenses
+        WHERE user_id = :user_id AND date >= :start AND date < :end
+        GROUP BY category""",
+    "list, date filter": """
+        SELECT * FROM expenses
+        WHERE user_id = :user_id AND date >= :start AND date < :end
+        ORDER BY date DESC, id DESC LIMIT 21""",
+}
+
+
+def explain(conn, title, queries, params):
+    print(f"==== {title}")
+    for name, sql in queries.items():
+        print(f"---- {name}")
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars()
+        print("\n".join(plan))
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=settings.database_url)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=200_000, help="total expenses to seed")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        conn.execute(text(SEED_USERS), {"users": args.users})
+        conn.execute(text(SEED_EXPENSES), {"per_user": args.rows // args.users})
+        user_id = conn.execute(text("SELECT id FROM users ORDER BY api_key LIMIT 1")).scalar()
+
+    today = date.today()
+    start, end = month_bounds(today.year, today.month)
+    params = {
+        "user_id": user_id, "year": today.year, "month": today.month,
+        "start": start, "end": end, "last_day": date.fromordinal(end.toordinal() - 1),
+    }
+
+    for title, ddl, queries in (("before", OLD_INDEXES, BEFORE), ("after", NEW_INDEXES, AFTER)):
+        with engine.begin() as conn:
+            for statement in ddl:
+                conn.execute(text(statement))
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE expenses"))
+            explain(conn, title, queries, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Drive the expense API at fixed concurrency and record latency percentiles.
+
+Run ``benchmarks.seed`` first, then point this at a running server (or let
+it start one with ``--spawn``). Each scenario runs for ``--duration``
+seconds after a warmup; results are written as JSON and can be compared
+against an earlier run to catch regressions.
+
+    python -m benchmarks.load_test --spawn --url postgresql+psycopg2://... \\
+        --concurrency 16 --duration 20 --output results/today.json --compare results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.pagination import encode_cursor
+
+Scenario = Callable[[httpx.AsyncClient, dict, random.Random], Awaitable[httpx.Response]]
+
+
+def _expense(rng: random.Random) -> dict:
+    return {
+        "amount": f"{rng.uniform(1, 150):.2f}",
+        "category": rng.choice(["Food", "Food", "Transport", "Shopping", "Utilities", "Other"]),
+        "description": "load test",
+        "date": (date.today() - timedelta(days=rng.randrange(365))).isoformat(),
+    }
+
+
+def list_shallow(client, user, rng):
+    return client.get("/api/v1/expenses", params={"per_page": 20}, headers=user["headers"])
+
+
+def list_deep_offset(client, user, rng):
+    page = max(1, user["expenses"] // 20 - rng.randrange(5))
+    return client.get(
+        "/api/v1/expenses", params={"per_page": 20, "page": page, "include_total": "false"},
+        headers=user["headers"]
+    )
+
+
+def list_deep_cursor(client, user, rng):
+    # A cursor near the oldest rows: the same depth as the offset case.
+    cursor = encode_cursor(user["oldest"], UUID(int=2**128 - 1))
+    return client.get(
+        "/api/v1/expenses", params={"per_page": 20, "cursor": cursor, "include_total": "false"},
+        headers=user["headers"]
+    )
+
+
+def summary(client, user, rng):
+    month = date.today().replace(day=1) - timedelta(days=31 * rng.randrange(12))
+    return client.get(
+        "/api/v1/summary/monthly", params={"year": month.year, "month": month.month},
+        headers=user["headers"]
+    )
+
+
+def create(client, user, rng):
+    return client.post("/api/v1/expenses", json=_expense(rng), headers=user["headers"])
+
+
+def bulk(client, user, rng):
+    return client.post(
+        "/api/v1/expenses/bulk", json=[_expense(rng) for _ in range(100)],
+        headers=user["headers"]
+    )
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "list_shallow": list_shallow,
+    "list_deep_offset": list_deep_offset,
+    "list_deep_cursor": list_deep_cursor,
+    "summary": summary,
+    "create": create,
+    "bulk": bulk,
+}
+
+
+def load_users(url: str, limit: int) -> list[dict]:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT u.api_key, count(e.id), min(e.date)
+            FROM users u JOIN expenses e ON e.user_id = u.id
+            WHERE u.api_key LIKE 'bench\\_%'
+            GROUP BY u.api_key
+            ORDER BY count(e.id) DESC
+            LIMIT :limit
+        """), {"limit": limit}).all()
+    engine.dispose()
+    if not rows:
+        sys.exit("no bench_ users found; run python -m benchmarks.seed first")
+    return [
+        {"headers": {"X-API-Key": api_key}, "expenses": count, "oldest": oldest}
+        for api_key, count, oldest in rows
+    ]
+
+
+async def run_scenario(
+    base_url: str,
+    scenario: Scenario,
+    users: list[dict],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        measure_from = started + warmup
+        deadline = measure_from + duration
+
+        async def worker(index: int) -> None:
+            nonlocal errors
+            rng = random.Random(seed + index)
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    return
+                response = await scenario(client, rng.choice(users), rng)
+                finished = time.perf_counter()
+                if now < measure_from:
+                    continue
+                if response.status_code >= 400:
+                    errors += 1
+                latencies.append(finished - now)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    ms = sorted(1000 * value for value in latencies)
+    cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / duration, 1),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "max_ms": round(ms[-1], 2),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("requests") or not result.get("requests"):
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        print(f"{name:>18}: p95 {before['p95_ms']:8.2f} -> {result['p95_ms']:8.2f} ms ({change:+.0%})")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def spawn_server(url: str, port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": url}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    sys.exit("server did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=settings.database_url, help="database the server uses")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start uvicorn against --url")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--users", type=int, default=100, help="bench users to spread load over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown")
+    args = parser.parse_args()
+
+    users = load_users(args.url, args.users)
+    server = None
+    if args.spawn:
+        port = int(httpx.URL(args.base_url).port or 8000)
+        server = spawn_server(args.url, port, args.workers)
+
+    results = {
+        "revision": _git_revision(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "concurrency": args.concurrency, "duration": args.duration,
+            "warmup": args.warmup, "users": len(users), "workers": args.workers,
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenarios.split(","):
+            result = asyncio.run(run_scenario(
+                args.base_url, SCENARIOS[name], users,
+                args.concurrency, args.duration, args.warmup, args.seed
+            ))
+            results["scenarios"][name] = result
+            print(f"{name:>18}: {json.dumps(result)}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"p95 regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
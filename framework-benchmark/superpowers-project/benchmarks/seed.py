@@ -0,0 +1,126 @@
+"""Seed a database with benchmark users and skewed expense data.
+
+Users are named ``bench_<n>`` so the load test can authenticate as them.
+A handful of users own most of the rows, dates cluster in recent months and
+categories follow a fixed mix, so indexes and rollups see realistic shapes.
+
+    python -m benchmarks.seed --url postgresql+psycopg2://... --users 1000 --rows 5000000
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models  # noqa: F401
+from app import partitions, rollups
+from app.config import settings
+from app.database import Base
+
+API_KEY_PREFIX = "bench_"
+
+# Weighted by repetition: food dominates, health and other are rare.
+CATEGORIES = (
+    "ARRAY['FOOD','FOOD','FOOD','FOOD','TRANSPORT','TRANSPORT','SHOPPING',"
+    "'SHOPPING','UTILITIES','ENTERTAINMENT','HEALTHCARE','OTHER']"
+)
+
+RESET = [
+    "DELETE FROM expense_rollups WHERE user_id IN (SELECT id FROM users WHERE api_key LIKE 'bench\\_%')",
+    "DELETE FROM expenses WHERE user_id IN (SELECT id FROM users WHERE api_key LIKE 'bench\\_%')",
+    "DELETE FROM users WHERE api_key LIKE 'bench\\_%'",
+]
+
+SEED_USERS = """
+INSERT INTO users (id, api_key, created_at, data_version)
+SELECT gen_random_uuid(), 'bench_' || n, now(), 0
+FROM generate_series(1, :users) n
+ON CONFLICT (api_key) DO NOTHING
+"""
+
+# power(random(), k) with k > 1 piles values up near zero: low user
+# ordinals and recent dates get most of the rows.
+SEED_EXPENSES = f"""
+WITH bench AS (
+    SELECT array_agg(id ORDER BY length(api_key), api_key) AS ids
+    FROM users WHERE api_key LIKE 'bench\\_%'
+)
+INSERT INTO expenses (id, user_id, amount, category, description, date, created_at, updated_at)
+SELECT gen_random_uuid(),
+       ids[1 + floor(power(random(), :user_skew) * cardinality(ids))::int],
+       round((1 + exp(random() * 5))::numeric, 2),
+       ({CATEGORIES})[1 + floor(random() * 12)::int]::expensecategory,
+       CASE WHEN random() < 0.3 THEN NULL ELSE 'benchmark expense' END,
+       current_date - floor(power(random(), :date_skew) * :days)::int,
+       now(), now()
+FROM bench, generate_series(1, :rows)
+"""
+
+
+def seed(
+    url: str,
+    users: int,
+    rows: int,
+    days: int = 1095,
+    user_skew: float = 3.0,
+    date_skew: float = 2.0,
+    batch: int = 500_000,
+    reset: bool = False
+) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        if reset:
+            for statement in RESET:
+                conn.execute(text(statement))
+        conn.execute(text(SEED_USERS), {"users": users})
+        # Create the partitions up front so no rows pile up in the default.
+        partitions.ensure_partitions(conn, date.today() - timedelta(days=days), date.today())
+
+    started = time.perf_counter()
+    done = 0
+    while done < rows:
+        size = min(batch, rows - done)
+        with engine.begin() as conn:
+            conn.execute(text(SEED_EXPENSES), {
+                "rows": size, "days": days, "user_skew": user_skew, "date_skew": date_skew
+            })
+        done += size
+        rate = done / (time.perf_counter() - started)
+        print(f"seeded {done}/{rows} expenses ({rate:,.0f} rows/s)")
+
+    # Seeding bypasses the ORM, so rebuild the rollups the app reads.
+    db = sessionmaker(bind=engine)()
+    try:
+        print(f"rebuilt {rollups.rebuild(db)} rollup rows")
+    finally:
+        db.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE users, expenses, expense_rollups"))
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=settings.database_url)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=1095, help="spread dates over this many days")
+    parser.add_argument("--user-skew", type=float, default=3.0, help="1 = uniform across users")
+    parser.add_argument("--date-skew", type=float, default=2.0, help="1 = uniform across days")
+    parser.add_argument("--batch", type=int, default=500_000, help="rows per transaction")
+    parser.add_argument("--reset", action="store_true", help="delete earlier bench_ users first")
+    args = parser.parse_args()
+
+    seed(
+        args.url, args.users, args.rows, days=args.days,
+        user_skew=args.user_skew, date_skew=args.date_skew,
+        batch=args.batch, reset=args.reset
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Per-row cost of the list response, ORM + double validation vs. rows + orjson.
+
+Seeds one throwaway user, then times both ways of turning a page of
+expenses into response bytes, split into fetch and serialize stages.
+
+    python -m benchmarks.serialization --url postgresql+psycopg2://... --rows 100
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.crud import EXPENSE_COLUMNS
+from app.database import Base
+from app.models import Expense
+from app.schemas import ExpenseOut, PaginatedExpenses, PaginationMeta
+from app.serialization import FastJSONResponse, expense_rows
+
+SEED_USER = "INSERT INTO users (id, api_key, created_at) VALUES (gen_random_uuid(), :api_key, now()) RETURNING id"
+
+SEED_EXPENSES = """
+INSERT INTO expenses (id, user_id, amount, category, description, date, created_at, updated_at)
+SELECT gen_random_uuid(), :user_id, round((random() * 200)::numeric, 2), 'FOOD',
+       'benchmark row ' || n, current_date - n, now(), now()
+FROM generate_series(1, :rows) n
+"""
+
+
+def fetch_orm(db, user_id, limit):
+    return db.query(Expense).filter(Expense.user_id == user_id).order_by(
+        Expense.date.desc(), Expense.id.desc()
+    ).limit(limit).all()
+
+
+def fetch_rows(db, user_id, limit):
+    return db.query(*EXPENSE_COLUMNS).filter(Expense.user_id == user_id).order_by(
+        Expense.date.desc(), Expense.id.desc()
+    ).limit(limit).all()
+
+
+async def render_before(field, expenses, meta):
+    # What the route and FastAPI did: validate each row into ExpenseOut, then
+    # validate and serialize the whole page again for response_model.
+    page = PaginatedExpenses(
+        data=[ExpenseOut.model_validate(e) for e in expenses], meta=meta
+    )
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def render_after(field, rows, meta):
+    return FastJSONResponse(
+        {"data": expense_rows(rows), "meta": meta.model_dump(mode="json")}
+    ).body
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=settings.database_url)
+    parser.add_argument("--rows", type=int, default=100, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        user_id = conn.execute(text(SEED_USER), {"api_key": f"bench_serialization_{time.time_ns()}"}).scalar()
+        conn.execute(text(SEED_EXPENSES), {"user_id": user_id, "rows": args.rows})
+
+    field = create_response_field(name="response", type_=PaginatedExpenses, mode="serialization")
+    meta = PaginationMeta(page=1, per_page=args.rows, total=args.rows, total_pages=1)
+    loop = asyncio.new_event_loop()
+    db = sessionmaker(bind=engine)()
+    try:
+        for name, fetch, render in (
+            ("before", fetch_orm, render_before),
+            ("after", fetch_rows, render_after),
+        ):
+            fetch_s, fetched = timed(
+                lambda: (db.expunge_all(), fetch(db, user_id, args.rows))[1], args.repeat
+            )
+            render_s, body = timed(
+                lambda: loop.run_until_complete(render(field, fetched, meta)), args.repeat
+            )
+            per_row = 1e6 / len(fetched)
+            print(
+                f"{name:>6}: fetch {fetch_s * per_row:7.2f} us/row   "
+                f"serialize {render_s * per_row:7.2f} us/row   body {len(body)} bytes"
+            )
+    finally:
+        db.close()
+        loop.close()
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM expenses WHERE user_id = :id"), {"id": user_id})
+            conn.execute(text("DELETE FROM users WHERE id = :id"), {"id": user_id})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,100 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Engine, create_engine, make_url, text
+from sqlalchemy.orm import Session
 
 from app.database import Base
 from app.config import settings
+from app.instrumentation import instrument_engine
 
 # Import models to register them with Base.metadata
 from app import models  # noqa: F401
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    engine = create_engine(settings.test_database_url)
-    TestingSessionLocal = sessionmaker(bind=engine)
+def _worker_database_url() -> str:
+    # Under pytest-xdist every worker gets its own database, e.g.
+    # expenses_test_gw0, so parallel workers never contend for rows or locks.
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if not worker:
+        return settings.test_database_url
+    url = make_url(settings.test_database_url)
+    return url.set(database=f"{url.database}_{worker}").render_as_string(hide_password=False)
+
+
+TEST_DATABASE_URL = _worker_database_url()
+
+
+def _ensure_database(url: str) -> None:
+    name = make_url(url).database
+    admin = create_engine(
+        make_url(url).set(database="postgres"), isolation_level="AUTOCOMMIT"
+    )
+    try:
+        with admin.connect() as conn:
+            exists = conn.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name}
+            )
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{name}"'))
+    finally:
+        admin.dispose()
+
+
+@contextmanager
+def second_database(suffix: str, url: Optional[str] = None) -> Iterator[Engine]:
+    # A sibling of the worker's test database, e.g. expenses_test_gw0_shard1,
+    # with a fresh schema that is dropped again afterwards.
+    if not url:
+        primary = make_url(TEST_DATABASE_URL)
+        url = primary.set(database=f"{primary.database}_{suffix}").render_as_string(hide_password=False)
+    _ensure_database(url)
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if TEST_DATABASE_URL != settings.test_database_url:
+        _ensure_database(TEST_DATABASE_URL)
+    engine = create_engine(TEST_DATABASE_URL)
+    instrument_engine(engine)
+    # Drop first so a schema left behind by an older checkout can't linger.
+    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
 
-    session = TestingSessionLocal()
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Every test starts from an empty database, so caches would go stale.
+    from app.auth import api_key_cache
+    from app.summary_cache import summary_cache
+    api_key_cache.clear()
+    summary_cache.clear()
+
+
+@pytest.fixture(scope="function")
+def db_session(engine):
+    # The test runs inside one outer transaction that is always rolled back;
+    # commits and rollbacks in the code under test only touch savepoints.
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
+
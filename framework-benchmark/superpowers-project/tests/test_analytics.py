@@ -0,0 +1,99 @@
+import pytest
+from decimal import Decimal
+from datetime import date, timedelta
+
+from app.models import User, Expense, ExpenseCategory
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(api_key="test_analytics")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _add(db_session, user, rows):
+    db_session.add_all([
+        Expense(user_id=user.id, amount=Decimal(amount), category=category, date=day)
+        for amount, category, day in rows
+    ])
+    db_session.commit()
+
+
+def test_fetch_columns_round_trips_values(db_session, user):
+    from app.analytics import CATEGORIES, fetch_columns
+
+    _add(db_session, user, [("12.34", ExpenseCategory.SHOPPING, date(2024, 2, 29))])
+    expense = db_session.query(Expense).filter(Expense.user_id == user.id).one()
+
+    rows = fetch_columns(db_session, user.id)
+    assert len(rows) == 1
+    assert rows["cents"][0] == 1234
+    assert CATEGORIES[rows["category"][0]] == ExpenseCategory.SHOPPING
+    assert bytes(rows["id"][0]) == expense.id.bytes
+
+    assert len(fetch_columns(db_session, user.id, start=date(2024, 3, 1))) == 0
+
+
+def test_daily_and_monthly_series(db_session, user):
+    from app.analytics import get_analytics
+
+    _add(db_session, user, [
+        ("10.00", ExpenseCategory.FOOD, date(2024, 1, 30)),
+        ("20.00", ExpenseCategory.FOOD, date(2024, 2, 1)),
+        ("5.00", ExpenseCategory.FOOD, date(2024, 2, 1)),
+    ])
+
+    result = get_analytics(db_session, user.id)
+    assert result.count == 3
+    assert result.daily.days == [date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1)]
+    assert result.daily.totals == [10.0, 0.0, 25.0]
+    assert result.daily.rolling_7 == [10.0, 5.0, 11.67]
+    assert result.monthly.months == [date(2024, 1, 1), date(2024, 2, 1)]
+    assert result.monthly.totals == [10.0, 25.0]
+    assert result.monthly.deltas == [None, 15.0]
+    assert result.monthly.pct_changes == [None, 1.5]
+
+
+def test_daily_span_is_capped(db_session, user):
+    from app.analytics import RangeTooLarge, get_analytics
+
+    _add(db_session, user, [
+        ("1.00", ExpenseCategory.FOOD, date(1, 1, 1)),
+        ("2.00", ExpenseCategory.FOOD, date(2024, 1, 1)),
+    ])
+
+    with pytest.raises(RangeTooLarge):
+        get_analytics(db_session, user.id, max_days=1000)
+    result = get_analytics(db_session, user.id, start=date(2024, 1, 1), max_days=1000)
+    assert result.daily.days == [date(2024, 1, 1)]
+
+
+def test_percentiles_and_anomalies(db_session, user):
+    from app.analytics import get_analytics
+
+    start = date(2024, 1, 1)
+    rows = [("10.00", ExpenseCategory.FOOD, start + timedelta(days=i)) for i in range(30)]
+    rows.append(("500.00", ExpenseCategory.FOOD, date(2024, 3, 1)))
+    rows.append(("40.00", ExpenseCategory.TRANSPORT, start))
+    _add(db_session, user, rows)
+
+    result = get_analytics(db_session, user.id, z_threshold=3.0)
+    food = result.categories[ExpenseCategory.FOOD]
+    assert food.count == 31
+    assert food.p50 == 10.0
+    assert result.categories[ExpenseCategory.TRANSPORT].p99 == 40.0
+    assert ExpenseCategory.OTHER not in result.categories
+
+    assert [(a.date, a.amount) for a in result.anomalies] == [(date(2024, 3, 1), 500.0)]
+    assert result.anomalies[0].z_score > 3
+
+
+def test_empty_history(db_session, user):
+    from app.analytics import get_analytics
+
+    result = get_analytics(db_session, user.id)
+    assert result.count == 0
+    assert result.start is None
+    assert result.daily.days == []
@@ -256,3 +256,482 @@ def test_monthly_summary_endpoint(client, test_user, db_session):
     assert data["grand_total"] == "80.00"
     assert len(data["categories"]) == 1
     assert data["categories"][0]["total"] == "80.00"
+
+
+def test_list_expenses_cursor_pagination(client, test_user, db_session):
+    from datetime import timedelta
+    from app.models import Expense, ExpenseCategory
+
+    for i in range(5):
+        expense = Expense(
+            user_id=test_user.id,
+            amount=Decimal("10.00"),
+            category=ExpenseCategory.FOOD,
+            date=date.today() - timedelta(days=i % 2)
+        )
+        db_session.add(expense)
+    db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/v1/expenses?per_page=2"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = client.get(url, headers={"X-API-Key": test_user.api_key})
+        assert response.status_code == 200
+        data = response.json()
+        seen.extend(e["id"] for e in data["data"])
+        if cursor:
+            assert data["meta"]["page"] is None
+        cursor = data["meta"]["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+
+def test_list_expenses_invalid_cursor(client, test_user):
+    response = client.get(
+        "/api/v1/expenses?cursor=not-a-cursor",
+        headers={"X-API-Key": test_user.api_key}
+    )
+    assert response.status_code == 400
+
+
+def test_list_expenses_without_total(client, test_user, db_session):
+    from app.models import Expense, ExpenseCategory
+
+    for i in range(3):
+        expense = Expense(
+            user_id=test_user.id,
+            amount=Decimal("10.00"),
+            category=ExpenseCategory.FOOD,
+            date=date.today()
+        )
+        db_session.add(expense)
+    db_session.commit()
+
+    response = client.get(
+        "/api/v1/expenses?per_page=2&include_total=false",
+        headers={"X-API-Key": test_user.api_key}
+    )
+    assert response.status_code == 200
+    meta = response.json()["meta"]
+    assert meta["total"] is None
+    assert meta["total_pages"] is None
+    assert meta["total_kind"] == "omitted"
+    assert meta["has_more"] is True
+
+
+def test_list_expenses_estimated_total(client, test_user):
+    response = client.get(
+        "/api/v1/expenses?estimate_total=true",
+        headers={"X-API-Key": test_user.api_key}
+    )
+    assert response.status_code == 200
+    meta = response.json()["meta"]
+    assert meta["total_kind"] == "estimated"
+    assert meta["total"] >= 0
+
+    response = client.get(
+        "/api/v1/expenses?estimate_total=true&category=Food",
+        headers={"X-API-Key": test_user.api_key}
+    )
+    assert response.json()["meta"]["total_kind"] == "exact"
+
+
+def test_pool_status_endpoint(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "internal_token", "secret")
+    response = client.get("/internal/pool", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"database"}
+    assert {"size", "checked_out", "overflow", "wait_avg_ms"} <= set(data["database"])
+
+
+def test_bulk_create_expenses_json(client, test_user, db_session):
+    from app.models import Expense
+
+    response = client.post(
+        "/api/v1/expenses/bulk",
+        headers={"X-API-Key": test_user.api_key},
+        json=[
+            {"amount": "10.00", "category": "Food", "date": "2024-01-05"},
+            {"amount": "-1.00", "category": "Food", "date": "2024-01-05"},
+            {"amount": "5.25", "category": "Transport", "date": "2024-01-06"},
+        ]
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 1
+    assert [r["status"] for r in data["results"]] == ["created", "invalid", "created"]
+    assert data["results"][1]["errors"][0]["loc"] == ["amount"]
+    assert db_session.query(Expense).filter(Expense.user_id == test_user.id).count() == 2
+
+    summary = client.get(
+        "/api/v1/summary/monthly?year=2024&month=1",
+        headers={"X-API-Key": test_user.api_key}
+    ).json()
+    assert summary["grand_total"] == "15.25"
+
+
+def test_bulk_create_expenses_ndjson(client, test_user):
+    body = "\n".join([
+        '{"amount": "1.00", "category": "Food", "date": "2024-01-05"}',
+        '{"amount": "2.00", "category": "Other", "date": "2024-01-05"}',
+    ])
+    response = client.post(
+        "/api/v1/expenses/bulk",
+        headers={"X-API-Key": test_user.api_key, "Content-Type": "application/x-ndjson"},
+        content=body
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+
+
+def test_bulk_create_expenses_limits(client, test_user, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "bulk_max_items", 1)
+    response = client.post(
+        "/api/v1/expenses/bulk",
+        headers={"X-API-Key": test_user.api_key},
+        json=[{}, {}]
+    )
+    assert response.status_code == 413
+
+    response = client.post(
+        "/api/v1/expenses/bulk",
+        headers={"X-API-Key": test_user.api_key},
+        json={"amount": "1.00"}
+    )
+    assert response.status_code == 400
+
+
+def test_bulk_create_expenses_byte_limit(client, test_user, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "bulk_max_bytes", 64)
+    item = {"amount": "1.00", "category": "Food", "date": "2024-01-05"}
+    response = client.post(
+        "/api/v1/expenses/bulk",
+        headers={"X-API-Key": test_user.api_key},
+        json=[item, item]
+    )
+    assert response.status_code == 413
+
+    # Without a Content-Length the cap applies while the body streams in.
+    response = client.post(
+        "/api/v1/expenses/bulk",
+        headers={"X-API-Key": test_user.api_key, "Content-Type": "application/x-ndjson"},
+        content=(b'{"amount": "1.00", "category": "Food", "date": "2024-01-05"}\n' for _ in range(2))
+    )
+    assert response.status_code == 413
+
+
+def test_bulk_create_expenses_rejects_oversized_amount(client, test_user):
+    response = client.post(
+        "/api/v1/expenses/bulk",
+        headers={"X-API-Key": test_user.api_key},
+        json=[
+            {"amount": "10.00", "category": "Food", "date": "2024-01-05"},
+            {"amount": "99999999999.00", "category": "Food", "date": "2024-01-05"},
+        ]
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["results"][1]["status"] == "invalid"
+
+
+def test_export_expenses_csv(client, test_user, db_session):
+    import csv
+    import io
+    from app.models import Expense, ExpenseCategory
+
+    db_session.add_all([
+        Expense(user_id=test_user.id, amount=Decimal("10.00"),
+                category=ExpenseCategory.FOOD, description='a, "quoted"', date=date(2024, 1, 2)),
+        Expense(user_id=test_user.id, amount=Decimal("20.00"),
+                category=ExpenseCategory.TRANSPORT, date=date(2024, 1, 3)),
+    ])
+    db_session.commit()
+
+    response = client.get(
+        "/api/v1/expenses/export?format=csv",
+        headers={"X-API-Key": test_user.api_key}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [r["amount"] for r in rows] == ["20.00", "10.00"]
+    assert rows[1]["description"] == 'a, "quoted"'
+    assert rows[0]["category"] == "Transport"
+
+
+def test_export_expenses_ndjson_filtered(client, test_user, db_session):
+    import json
+    from app.models import Expense, ExpenseCategory
+
+    db_session.add_all([
+        Expense(user_id=test_user.id, amount=Decimal("10.00"),
+                category=ExpenseCategory.FOOD, date=date(2024, 1, 2)),
+        Expense(user_id=test_user.id, amount=Decimal("20.00"),
+                category=ExpenseCategory.TRANSPORT, date=date(2024, 1, 3)),
+    ])
+    db_session.commit()
+
+    response = client.get(
+        "/api/v1/expenses/export?format=ndjson&category=Food",
+        headers={"X-API-Key": test_user.api_key}
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["amount"] == "10.00"
+    assert lines[0]["date"] == "2024-01-02"
+
+
+def test_import_expenses_endpoint(client, test_user, db_session):
+    from app.models import Expense
+
+    def body():
+        yield b"amount,category,description,date\n"
+        yield b"10.00,Food,Lunch,2024-01-05\n12.00,Shop"
+        yield b"ping,,2024-01-06\n"
+
+    response = client.post(
+        "/api/v1/expenses/import",
+        headers={"X-API-Key": test_user.api_key, "Content-Type": "text/csv"},
+        content=body()
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["imported"] == 2
+    assert data["failed"] == 0
+    assert db_session.query(Expense).filter(Expense.user_id == test_user.id).count() == 2
+
+
+def test_import_expenses_rejects_malformed_csv(client, test_user, db_session):
+    from app.models import Expense
+
+    response = client.post(
+        "/api/v1/expenses/import",
+        headers={"X-API-Key": test_user.api_key, "Content-Type": "text/csv"},
+        content=b"amount,category,description,date\n10.00,Food,,2024-01-05\n\xff\xfe,Food,,2024-01-06\n"
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 3:")
+    assert db_session.query(Expense).filter(Expense.user_id == test_user.id).count() == 0
+
+
+def test_update_and_delete_missing_expense(client, test_user):
+    from uuid import uuid4
+
+    response = client.put(
+        f"/api/v1/expenses/{uuid4()}",
+        headers={"X-API-Key": test_user.api_key},
+        json={"amount": "30.00"}
+    )
+    assert response.status_code == 404
+
+    response = client.delete(
+        f"/api/v1/expenses/{uuid4()}",
+        headers={"X-API-Key": test_user.api_key}
+    )
+    assert response.status_code == 404
+
+
+def test_cache_status_endpoint(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "internal_token", "secret")
+    response = client.get("/internal/cache", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"auth", "summary"}
+    assert data["summary"]["backend"] == "local"
+
+
+def test_internal_endpoints_require_token(client, monkeypatch):
+    from app.config import settings
+
+    for path in ["/internal/pool", "/internal/cache", "/metrics"]:
+        monkeypatch.setattr(settings, "internal_token", None)
+        assert client.get(path, headers={"X-Internal-Token": "secret"}).status_code == 404
+
+        monkeypatch.setattr(settings, "internal_token", "secret")
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={"X-Internal-Token": "wrong"}).status_code == 401
+
+
+def test_conditional_get_on_list_and_summary(client, test_user):
+    headers = {"X-API-Key": test_user.api_key}
+    for path in ["/api/v1/expenses", "/api/v1/summary/monthly?year=2024&month=1"]:
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        response = client.get(path, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    before = client.get("/api/v1/expenses", headers=headers).headers["ETag"]
+    client.post("/api/v1/expenses", headers=headers, json={
+        "amount": "5.00", "category": "Food", "date": "2024-01-10"
+    })
+    response = client.get("/api/v1/expenses", headers={**headers, "If-None-Match": before})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != before
+    assert len(response.json()["data"]) == 1
+
+
+def test_conditional_get_on_single_expense(client, test_user):
+    headers = {"X-API-Key": test_user.api_key}
+    created = client.post("/api/v1/expenses", headers=headers, json={
+        "amount": "5.00", "category": "Food", "date": "2024-01-10"
+    }).json()
+    path = f"/api/v1/expenses/{created['id']}"
+
+    etag = client.get(path, headers=headers).headers["ETag"]
+    response = client.get(path, headers={**headers, "If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+
+    client.put(path, headers=headers, json={"amount": "6.00"})
+    response = client.get(path, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["amount"] == "6.00"
+
+
+def test_summary_series_endpoint(client, test_user):
+    headers = {"X-API-Key": test_user.api_key}
+    client.post("/api/v1/expenses/bulk", headers=headers, json=[
+        {"amount": "10.00", "category": "Food", "date": "2024-01-05"},
+        {"amount": "2.50", "category": "Transport", "date": "2024-03-09"},
+    ])
+
+    response = client.get(
+        "/api/v1/summary/series?start=2024-01-01&end=2024-12-31&bucket=month&by=category",
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["buckets"]) == 12
+    assert data["buckets"][2] == "2024-03-01"
+    assert data["totals"][:3] == ["10.00", "0.00", "2.50"]
+    assert data["categories"]["Food"]["counts"][0] == 1
+    assert "ETag" in response.headers
+
+    response = client.get(
+        "/api/v1/summary/series?start=2024-02-01&end=2024-01-01", headers=headers
+    )
+    assert response.status_code == 400
+
+    response = client.get(
+        "/api/v1/summary/series?start=2000-01-01&end=2024-01-01&bucket=day", headers=headers
+    )
+    assert response.status_code == 400
+
+    for bucket in ["day", "week", "month"]:
+        response = client.get(
+            f"/api/v1/summary/series?start=9999-12-01&end=9999-12-31&bucket={bucket}", headers=headers
+        )
+        assert response.status_code == 200
+
+
+def test_analytics_endpoint(client, test_user):
+    headers = {"X-API-Key": test_user.api_key}
+    client.post("/api/v1/expenses", headers=headers, json={
+        "amount": "12.00", "category": "Food", "date": "2024-01-05"
+    })
+
+    response = client.get("/api/v1/analytics", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 1
+    assert data["categories"]["Food"]["p50"] == 12.0
+    assert data["daily"]["days"] == ["2024-01-05"]
+
+    etag = response.headers["ETag"]
+    response = client.get("/api/v1/analytics", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_analytics_rejects_long_spans(client, test_user, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "summary_series_max_buckets", 10)
+    headers = {"X-API-Key": test_user.api_key}
+    response = client.get("/api/v1/analytics?start=2024-01-01&end=2024-12-31", headers=headers)
+    assert response.status_code == 400
+
+    for day in ["2024-01-01", "2024-03-01"]:
+        client.post("/api/v1/expenses", headers=headers, json={
+            "amount": "12.00", "category": "Food", "date": day
+        })
+    assert client.get("/api/v1/analytics", headers=headers).status_code == 400
+    assert client.get("/api/v1/analytics?start=2024-02-01", headers=headers).status_code == 200
+
+
+def test_create_expense_idempotency_key_replays(client, test_user, db_session):
+    from app.models import Expense
+
+    headers = {"X-API-Key": test_user.api_key, "Idempotency-Key": "retry-1"}
+    payload = {"amount": "12.00", "category": "Food", "date": "2024-01-15"}
+
+    first = client.post("/api/v1/expenses", headers=headers, json=payload)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    second = client.post("/api/v1/expenses", headers=headers, json=payload)
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    assert db_session.query(Expense).filter(Expense.user_id == test_user.id).count() == 1
+
+    reused = client.post("/api/v1/expenses", headers=headers, json={**payload, "amount": "13.00"})
+    assert reused.status_code == 422
+
+
+def test_create_expense_idempotency_key_still_validates_new_requests(client, test_user):
+    headers = {"X-API-Key": test_user.api_key, "Idempotency-Key": "retry-2"}
+    first = client.post(
+        "/api/v1/expenses", headers=headers,
+        json={"amount": "12.00", "category": "Food", "date": "2024-01-15"}
+    )
+    assert first.status_code == 201
+
+    invalid = client.post(
+        "/api/v1/expenses", headers={**headers, "Idempotency-Key": "retry-3"},
+        json={"amount": "-1", "category": "Food", "date": "2024-01-15"}
+    )
+    assert invalid.status_code == 422
+
+
+def test_create_expense_with_group_commit(client, test_user, db_session, monkeypatch):
+    from contextlib import nullcontext
+    from app.config import settings
+    from app.group_commit import GroupCommitter
+    from app import main
+
+    committer = GroupCommitter(lambda: nullcontext(db_session), max_batch=10, max_delay=0.001)
+    monkeypatch.setattr(settings, "group_commit", True)
+    monkeypatch.setattr(main, "group_committer", committer)
+    try:
+        response = client.post(
+            "/api/v1/expenses",
+            headers={"X-API-Key": test_user.api_key},
+            json={"amount": "9.99", "category": "Food", "date": "2024-01-15"}
+        )
+    finally:
+        committer.stop()
+
+    assert response.status_code == 201
+    assert response.json()["amount"] == "9.99"
+    assert "id" in response.json()
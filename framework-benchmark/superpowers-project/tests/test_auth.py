@@ -23,3 +23,45 @@ def test_get_current_user_invalid_key(db_session):
 
     assert exc_info.value.status_code == 401
     assert exc_info.value.detail == "Invalid API key"
+
+
+def test_get_current_user_served_from_cache(db_session):
+    from sqlalchemy import text
+    from app.auth import get_current_user, invalidate_api_key, api_key_cache
+    from app.models import User
+
+    user = User(api_key="cached_api_key")
+    db_session.add(user)
+    db_session.commit()
+
+    get_current_user("cached_api_key", db_session)
+
+    # Rotate the key behind the ORM's back; the cache still answers.
+    db_session.execute(text("UPDATE users SET api_key = 'rotated' WHERE id = :id"), {"id": user.id})
+    db_session.commit()
+
+    hits = api_key_cache.hits
+    assert get_current_user("cached_api_key", db_session).id == user.id
+    assert api_key_cache.hits == hits + 1
+
+    invalidate_api_key("cached_api_key")
+    with pytest.raises(HTTPException):
+        get_current_user("cached_api_key", db_session)
+
+
+def test_deleting_user_revokes_cached_key(db_session):
+    from app.auth import get_current_user
+    from app.models import User
+
+    user = User(api_key="doomed_api_key")
+    db_session.add(user)
+    db_session.commit()
+
+    get_current_user("doomed_api_key", db_session)
+
+    db_session.delete(user)
+    db_session.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        get_current_user("doomed_api_key", db_session)
+    assert exc_info.value.status_code == 401
@@ -0,0 +1,51 @@
+def make_cache(max_size=2, ttl=10.0):
+    from app.cache import TTLCache
+
+    now = [0.0]
+    cache = TTLCache(max_size=max_size, ttl=ttl, clock=lambda: now[0])
+    return cache, now
+
+
+def test_entries_expire_after_ttl():
+    cache, now = make_cache()
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    now[0] = 10.0
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache, _ = make_cache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_stats_and_invalidation():
+    cache, _ = make_cache()
+    cache.set("a", 1)
+    cache.set("b", 1)
+    cache.get("a")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+    cache.invalidate_where(lambda key, value: value == 1)
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache, _ = make_cache(ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
@@ -85,9 +85,10 @@ def test_get_expenses_pagination(db_session):
         db_session.add(expense)
     db_session.commit()
 
-    expenses, total = get_expenses(db_session, user.id, skip=0, limit=3)
+    expenses, total, has_more = get_expenses(db_session, user.id, skip=0, limit=3)
     assert len(expenses) == 3
     assert total == 5
+    assert has_more is True
 
 
 def test_update_expense(db_session):
@@ -155,7 +156,7 @@ def test_get_expenses_with_filters(db_session):
     db_session.add_all([expense1, expense2])
     db_session.commit()
 
-    expenses, total = get_expenses(
+    expenses, total, _ = get_expenses(
         db_session, user.id,
         category=ExpenseCategory.FOOD
     )
@@ -163,6 +164,22 @@ def test_get_expenses_with_filters(db_session):
     assert expenses[0].category == ExpenseCategory.FOOD
 
 
+def test_get_expenses_end_date_at_date_max(db_session):
+    from app.crud import get_expenses, iter_expenses
+
+    user = User(api_key="test_date_max")
+    db_session.add(user)
+    db_session.add(Expense(
+        user=user, amount=Decimal("10.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 5)
+    ))
+    db_session.commit()
+
+    _, total, _ = get_expenses(db_session, user.id, end_date=date.max)
+    assert total == 1
+    batches = list(iter_expenses(db_session, user.id, end_date=date.max))
+    assert [row.date for batch in batches for row in batch] == [date(2024, 1, 5)]
+
+
 def test_get_monthly_summary(db_session):
     from app.crud import get_monthly_summary
 
@@ -204,3 +221,243 @@ def test_get_monthly_summary(db_session):
     assert food_total.total == Decimal("80.00")
 
     assert summary.grand_total == Decimal("100.00")
+
+
+def test_get_expenses_after_cursor(db_session):
+    from datetime import timedelta
+    from app.crud import get_expenses
+
+    user = User(api_key="test_cursor")
+    db_session.add(user)
+    db_session.commit()
+
+    today = date.today()
+    for days_ago in (0, 0, 1, 2):
+        db_session.add(Expense(
+            user_id=user.id,
+            amount=Decimal("10.00"),
+            category=ExpenseCategory.FOOD,
+            date=today - timedelta(days=days_ago)
+        ))
+    db_session.commit()
+
+    first, _, _ = get_expenses(db_session, user.id, limit=2)
+    last = first[-1]
+    rest, total, has_more = get_expenses(db_session, user.id, limit=10, cursor=(last.date, last.id))
+
+    assert total == 4
+    assert len(rest) == 2
+    assert has_more is False
+    assert {e.id for e in first}.isdisjoint(e.id for e in rest)
+    assert all((e.date, e.id) < (last.date, last.id) for e in rest)
+
+
+def test_get_expenses_without_total(db_session):
+    from app.crud import get_expenses
+    from app.schemas import TotalKind
+
+    user = User(api_key="test_no_total")
+    db_session.add(user)
+    db_session.commit()
+
+    for i in range(3):
+        db_session.add(Expense(
+            user_id=user.id,
+            amount=Decimal("10.00"),
+            category=ExpenseCategory.FOOD,
+            date=date.today()
+        ))
+    db_session.commit()
+
+    expenses, total, has_more = get_expenses(
+        db_session, user.id, limit=3, total_kind=TotalKind.OMITTED
+    )
+    assert len(expenses) == 3
+    assert total is None
+    assert has_more is False
+
+    _, estimate, _ = get_expenses(
+        db_session, user.id, limit=3, total_kind=TotalKind.ESTIMATED
+    )
+    assert estimate >= 0
+
+
+def test_month_bounds_rolls_over_year():
+    from app.crud import month_bounds
+
+    assert month_bounds(2024, 12) == (date(2024, 12, 1), date(2025, 1, 1))
+    assert month_bounds(2024, 2) == (date(2024, 2, 1), date(2024, 3, 1))
+
+
+def test_date_ranges_are_half_open(db_session):
+    from app.crud import get_expenses, get_monthly_summary
+
+    user = User(api_key="test_ranges")
+    db_session.add(user)
+    db_session.commit()
+
+    for day in (date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 29), date(2024, 3, 1)):
+        db_session.add(Expense(
+            user_id=user.id,
+            amount=Decimal("10.00"),
+            category=ExpenseCategory.FOOD,
+            date=day
+        ))
+    db_session.commit()
+
+    summary = get_monthly_summary(db_session, user.id, 2024, 2)
+    assert summary.grand_total == Decimal("20.00")
+
+    expenses, total, _ = get_expenses(
+        db_session, user.id,
+        start_date=date(2024, 2, 1), end_date=date(2024, 2, 29)
+    )
+    assert total == 2
+    assert {e.date for e in expenses} == {date(2024, 2, 1), date(2024, 2, 29)}
+
+
+def test_bulk_create_expenses_keeps_input_order(db_session):
+    from app.crud import bulk_create_expenses
+    from app.schemas import ExpenseCreate
+
+    user = User(api_key="test_bulk")
+    db_session.add(user)
+    db_session.commit()
+
+    items = [
+        ExpenseCreate(amount=Decimal(f"{i}.00"), category=ExpenseCategory.FOOD, date=date.today())
+        for i in range(1, 6)
+    ]
+    ids = bulk_create_expenses(db_session, items, user.id)
+
+    amounts = {
+        e.id: e.amount
+        for e in db_session.query(Expense).filter(Expense.user_id == user.id)
+    }
+    assert [amounts[i] for i in ids] == [item.amount for item in items]
+
+
+def test_update_expense_by_id(db_session):
+    from app.crud import create_expense, update_expense_by_id, get_monthly_summary
+    from app.schemas import ExpenseCreate, ExpenseUpdate
+
+    owner = User(api_key="test_update_by_id")
+    other = User(api_key="test_update_by_id_other")
+    db_session.add_all([owner, other])
+    db_session.commit()
+
+    created = create_expense(db_session, ExpenseCreate(
+        amount=Decimal("25.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 10)
+    ), owner.id)
+
+    update = ExpenseUpdate(amount=Decimal("30.00"), date=date(2024, 2, 10))
+    assert update_expense_by_id(db_session, created.id, other.id, update) is None
+
+    updated = update_expense_by_id(db_session, created.id, owner.id, update)
+    assert updated.amount == Decimal("30.00")
+    assert updated.date == date(2024, 2, 10)
+    assert updated.updated_at >= created.created_at
+
+    assert get_monthly_summary(db_session, owner.id, 2024, 1).categories == []
+    assert get_monthly_summary(db_session, owner.id, 2024, 2).grand_total == Decimal("30.00")
+
+
+def test_delete_expense_by_id(db_session):
+    from app.crud import create_expense, delete_expense_by_id, get_expense, get_monthly_summary
+    from app.schemas import ExpenseCreate
+
+    owner = User(api_key="test_delete_by_id")
+    other = User(api_key="test_delete_by_id_other")
+    db_session.add_all([owner, other])
+    db_session.commit()
+
+    created = create_expense(db_session, ExpenseCreate(
+        amount=Decimal("25.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 10)
+    ), owner.id)
+
+    assert delete_expense_by_id(db_session, created.id, other.id) is False
+    assert delete_expense_by_id(db_session, created.id, owner.id) is True
+    assert get_expense(db_session, created.id, owner.id) is None
+    assert get_monthly_summary(db_session, owner.id, 2024, 1).categories == []
+
+
+def _series_user(db_session):
+    from app.crud import bulk_create_expenses
+    from app.schemas import ExpenseCreate
+
+    user = User(api_key="test_series")
+    db_session.add(user)
+    db_session.commit()
+    bulk_create_expenses(db_session, [
+        ExpenseCreate(amount=Decimal(amount), category=category, date=day)
+        for amount, category, day in [
+            ("10.00", ExpenseCategory.FOOD, date(2024, 1, 1)),
+            ("5.00", ExpenseCategory.FOOD, date(2024, 1, 31)),
+            ("7.50", ExpenseCategory.TRANSPORT, date(2024, 3, 4)),
+        ]
+    ], user.id)
+    return user
+
+
+def test_summary_series_months_are_zero_filled(db_session):
+    from app.crud import get_summary_series
+    from app.schemas import SeriesBucket
+
+    user = _series_user(db_session)
+    series = get_summary_series(
+        db_session, user.id, date(2024, 1, 1), date(2024, 4, 30), SeriesBucket.MONTH,
+        by_category=True
+    )
+
+    assert series.buckets == [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1)]
+    assert series.totals == [Decimal("15.00"), 0, Decimal("7.50"), 0]
+    assert series.counts == [2, 0, 1, 0]
+    assert series.categories[ExpenseCategory.FOOD].counts == [2, 0, 0, 0]
+    assert series.categories[ExpenseCategory.TRANSPORT].totals == [0, 0, Decimal("7.50"), 0]
+
+
+def test_summary_series_partial_months_scan_expenses(db_session):
+    from app.crud import get_summary_series
+    from app.schemas import SeriesBucket
+
+    user = _series_user(db_session)
+    series = get_summary_series(
+        db_session, user.id, date(2024, 1, 15), date(2024, 3, 3), SeriesBucket.MONTH
+    )
+
+    # Rollups would count the 1 Jan and 4 Mar rows; the range excludes them.
+    assert series.totals == [Decimal("5.00"), 0, 0]
+    assert series.categories is None
+
+
+def test_summary_series_days_and_weeks(db_session):
+    from app.crud import get_summary_series
+    from app.schemas import SeriesBucket
+
+    user = _series_user(db_session)
+    days = get_summary_series(
+        db_session, user.id, date(2024, 1, 30), date(2024, 2, 1), SeriesBucket.DAY
+    )
+    assert days.buckets == [date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1)]
+    assert days.counts == [0, 1, 0]
+
+    weeks = get_summary_series(
+        db_session, user.id, date(2024, 1, 1), date(2024, 1, 31), SeriesBucket.WEEK
+    )
+    assert weeks.buckets[0] == date(2024, 1, 1)
+    assert weeks.buckets[-1] == date(2024, 1, 29)
+    assert weeks.counts == [1, 0, 0, 0, 1]
+
+
+def test_series_buckets_at_the_end_of_time():
+    from app.crud import bucket_count, series_buckets
+    from app.schemas import SeriesBucket
+
+    start, end = date(9999, 12, 1), date(9999, 12, 31)
+    assert series_buckets(start, end, SeriesBucket.MONTH) == [start]
+    assert series_buckets(start, end, SeriesBucket.DAY)[-1] == end
+    assert series_buckets(date(9999, 12, 27), end, SeriesBucket.WEEK) == [date(9999, 12, 27)]
+
+    for bucket in SeriesBucket:
+        assert bucket_count(start, end, bucket) == len(series_buckets(start, end, bucket))
+    assert bucket_count(date(1, 1, 1), date(9999, 12, 1), SeriesBucket.DAY) == 3652029
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.config import settings
+
+
+def test_pool_stats_track_checkouts_and_timeouts():
+    from app.database import TimedQueuePool, pool_stats
+
+    engine = create_engine(
+        settings.test_database_url, poolclass=TimedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    try:
+        with engine.connect():
+            assert pool_stats(engine)["checked_out"] == 1
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        stats = pool_stats(engine)
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 50
+    finally:
+        engine.dispose()
+
+
+def test_statement_timeout_connect_args(monkeypatch):
+    from app import database
+
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 250)
+    assert database._connect_args() == {"options": "-c statement_timeout=250"}
+
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 0)
+    assert database._connect_args() == {}
@@ -0,0 +1,18 @@
+def test_make_etag_is_quoted_and_stable():
+    from app.etags import make_etag
+
+    etag = make_etag("user", 3, None)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("user", 3, None)
+    assert etag != make_etag("user", 4, None)
+
+
+def test_etag_matches():
+    from app.etags import etag_matches
+
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,102 @@
+from concurrent.futures import wait
+from datetime import date
+from decimal import Decimal
+from threading import Lock
+from uuid import uuid4
+
+import pytest
+
+from app.models import User, Expense, ExpenseCategory, ExpenseRollup
+
+
+class _SharedSession:
+    # The flusher thread borrows the test session; the lock keeps it from
+    # running while the test thread is using it.
+    def __init__(self, db_session):
+        self.db_session = db_session
+        self.lock = Lock()
+        self.sessions = 0
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.sessions += 1
+        return self.db_session
+
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+def _user(db_session):
+    user = User(api_key="test_group_commit")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _row(user, amount, day=date(2024, 1, 5), **overrides):
+    return {
+        "user_id": user.id, "amount": Decimal(amount), "category": ExpenseCategory.FOOD,
+        "description": None, "date": day, **overrides
+    }
+
+
+def test_queued_rows_share_one_commit(db_session):
+    from app.group_commit import GroupCommitter
+
+    user = _user(db_session)
+    sessions = _SharedSession(db_session)
+    committer = GroupCommitter(sessions, max_batch=100, max_delay=0.2)
+    try:
+        futures = [committer.submit(_row(user, f"{i}.00")) for i in range(1, 11)]
+        wait(futures, timeout=5)
+    finally:
+        committer.stop()
+
+    results = [future.result() for future in futures]
+    assert [r.amount for r in results] == [Decimal(f"{i}.00") for i in range(1, 11)]
+    assert len({r.id for r in results}) == 10
+    assert sessions.sessions == 1
+
+    assert db_session.query(Expense).filter(Expense.user_id == user.id).count() == 10
+    rollup = db_session.query(ExpenseRollup).filter(ExpenseRollup.user_id == user.id).one()
+    assert (rollup.total, rollup.count) == (Decimal("55.00"), 10)
+
+
+def test_batches_are_capped(db_session):
+    from app.group_commit import GroupCommitter
+
+    user = _user(db_session)
+    sessions = _SharedSession(db_session)
+    committer = GroupCommitter(sessions, max_batch=3, max_delay=0.2)
+    try:
+        futures = [committer.submit(_row(user, "1.00")) for _ in range(7)]
+        wait(futures, timeout=5)
+    finally:
+        committer.stop()
+
+    assert all(future.exception() is None for future in futures)
+    assert sessions.sessions == 3
+
+
+def test_failed_batch_only_fails_the_bad_row(db_session):
+    from sqlalchemy.exc import IntegrityError
+    from app.group_commit import GroupCommitter
+
+    user = _user(db_session)
+    sessions = _SharedSession(db_session)
+    committer = GroupCommitter(sessions, max_batch=10, max_delay=0.2)
+    try:
+        good = committer.submit(_row(user, "1.00"))
+        bad = committer.submit(_row(user, "2.00", user_id=uuid4()))
+        other = committer.submit(_row(user, "3.00"))
+        wait([good, bad, other], timeout=5)
+    finally:
+        committer.stop()
+
+    assert good.result().amount == Decimal("1.00")
+    assert other.result().amount == Decimal("3.00")
+    with pytest.raises(IntegrityError):
+        bad.result()
@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta
+
+from app.models import User, IdempotencyKey
+
+
+def _user(db_session, api_key="test_idempotency"):
+    user = User(api_key=api_key)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def test_save_then_replay(db_session):
+    from app.idempotency import IdempotentReplay, PendingKey, check, fingerprint, lookup, save
+
+    user = _user(db_session)
+    pending = PendingKey(user.id, "key-1", fingerprint("POST", "/api/v1/expenses", b"{}"))
+    assert save(db_session, pending, 201, '{"id": "x"}')
+    db_session.commit()
+
+    # A second save of the same live key conflicts instead of overwriting.
+    assert not save(db_session, pending, 201, '{"id": "y"}')
+
+    stored = lookup(db_session, user.id, "key-1")
+    with pytest.raises(IdempotentReplay) as exc:
+        check(stored, pending)
+    assert exc.value.status_code == 201
+    assert exc.value.body == '{"id": "x"}'
+
+
+def test_check_rejects_different_request(db_session):
+    from fastapi import HTTPException
+    from app.idempotency import PendingKey, check, fingerprint, lookup, save
+
+    user = _user(db_session)
+    save(db_session, PendingKey(user.id, "key-1", fingerprint("POST", "/a", b"1")), 201, "{}")
+    db_session.commit()
+
+    stored = lookup(db_session, user.id, "key-1")
+    with pytest.raises(HTTPException) as exc:
+        check(stored, PendingKey(user.id, "key-1", fingerprint("POST", "/a", b"2")))
+    assert exc.value.status_code == 422
+
+
+def test_expired_keys_are_ignored_and_reused(db_session):
+    from app.idempotency import PendingKey, lookup, save
+
+    user = _user(db_session)
+    db_session.add(IdempotencyKey(
+        user_id=user.id, key="old", fingerprint="f", status_code=201,
+        response_body="{}", expires_at=datetime.utcnow() - timedelta(seconds=1)
+    ))
+    db_session.commit()
+
+    assert lookup(db_session, user.id, "old") is None
+    assert save(db_session, PendingKey(user.id, "old", "g"), 201, '{"new": true}')
+    db_session.commit()
+    assert lookup(db_session, user.id, "old").response_body == '{"new": true}'
+
+
+def test_purge_expired_in_batches(db_session):
+    from app.idempotency import purge_expired
+
+    user = _user(db_session)
+    now = datetime.utcnow()
+    db_session.add_all(
+        IdempotencyKey(
+            user_id=user.id, key=f"k{i}", fingerprint="f", status_code=201, response_body="{}",
+            expires_at=now - timedelta(hours=1) if i < 7 else now + timedelta(hours=1)
+        )
+        for i in range(10)
+    )
+    db_session.commit()
+
+    assert purge_expired(db_session, batch_size=3) == 7
+    remaining = db_session.query(IdempotencyKey.key).order_by(IdempotencyKey.key).all()
+    assert [key for key, in remaining] == ["k7", "k8", "k9"]
@@ -0,0 +1,64 @@
+from decimal import Decimal
+from datetime import date
+
+from app.models import User, Expense
+
+
+def test_read_csv_across_chunk_boundaries():
+    from app.imports import read_csv
+
+    body = 'amount,category,description,date\n1.00,Food,"two\nlines",2024-01-01\n2.00,Other,,2024-01-02\n'.encode()
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+    rows = list(read_csv(chunks))
+    assert [row["description"] for _, row in rows] == ["two\nlines", None]
+    assert [line for line, _ in rows] == [3, 4]
+
+
+def test_read_csv_names_the_malformed_line():
+    import pytest
+    from app.imports import MalformedCSV, read_csv
+
+    header = "amount,category,description,date\n".encode("utf-8-sig")
+    for bad_line in [b"2.00,Food,caf\xe9,2024-01-02\n", b"2.00,Food,a\x00b,2024-01-02\n"]:
+        with pytest.raises(MalformedCSV) as excinfo:
+            list(read_csv([header, b"1.00,Food,,2024-01-01\n", bad_line]))
+        assert excinfo.value.line == 3
+
+
+def test_import_csv_copies_valid_rows(db_session, monkeypatch):
+    from app.config import settings
+    from app.imports import import_csv
+    from app.crud import get_monthly_summary
+
+    monkeypatch.setattr(settings, "import_chunk_size", 2)
+    monkeypatch.setattr(settings, "import_max_errors", 1)
+
+    user = User(api_key="test_import")
+    db_session.add(user)
+    db_session.commit()
+
+    body = (
+        "amount,category,description,date\n"
+        "10.00,Food,Lunch,2024-01-05\n"
+        "-3.00,Food,,2024-01-05\n"
+        "2.50,Transport,,2024-01-06\n"
+        "4.00,Nope,,2024-01-07\n"
+        "1.25,Food,,2024-01-08\n"
+        "99999999999.00,Food,,2024-01-09\n"
+    ).encode()
+
+    result = import_csv(db_session, user.id, [body])
+
+    assert result.imported == 3
+    assert result.failed == 3
+    assert result.errors[0].line == 3
+    assert result.errors[0].errors[0]["loc"] == ["amount"]
+    assert result.errors_truncated is True
+
+    expenses = db_session.query(Expense).filter(Expense.user_id == user.id).all()
+    assert sorted(e.amount for e in expenses) == [Decimal("1.25"), Decimal("2.50"), Decimal("10.00")]
+    assert {e.description for e in expenses} == {"Lunch", None}
+
+    summary = get_monthly_summary(db_session, user.id, 2024, 1)
+    assert summary.grand_total == Decimal("13.75")
@@ -0,0 +1,62 @@
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(db_session):
+    from app.main import app
+    from app.database import get_db
+    from app.models import User
+
+    db_session.add(User(api_key="test_instrumentation"))
+    db_session.commit()
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+HEADERS = {"X-API-Key": "test_instrumentation"}
+
+
+def test_server_timing_and_log_line(client, caplog):
+    caplog.set_level(logging.INFO, logger="app.perf")
+    client.post("/api/v1/expenses", headers=HEADERS, json={
+        "amount": "1.00", "category": "Food", "date": "2024-01-01"
+    })
+
+    response = client.get("/api/v1/expenses", headers=HEADERS)
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert "db;dur=" in timing and "serialize;dur=" in timing and "app;dur=" in timing
+
+    record = json.loads(caplog.messages[-1])
+    assert record["route"] == "/api/v1/expenses"
+    assert record["status"] == 200
+    assert record["statements"] >= 2
+    assert record["db_ms"] > 0
+
+
+def test_serialization_time_for_response_model_routes(client, caplog):
+    caplog.set_level(logging.INFO, logger="app.perf")
+    client.get("/api/v1/summary/monthly?year=2024&month=1", headers=HEADERS)
+
+    record = json.loads(caplog.messages[-1])
+    assert record["route"] == "/api/v1/summary/monthly"
+    assert record["serialize_ms"] > 0
+
+
+def test_statement_budget_fails_request_in_debug(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "perf_debug", True)
+    monkeypatch.setattr(settings, "perf_statement_budget", 1)
+
+    response = client.get("/api/v1/expenses", headers=HEADERS)
+    assert response.status_code == 500
+    assert "budget" in response.json()["detail"]
+
+    monkeypatch.setattr(settings, "perf_debug", False)
+    assert client.get("/api/v1/expenses", headers=HEADERS).status_code == 200
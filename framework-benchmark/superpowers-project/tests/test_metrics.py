@@ -0,0 +1,91 @@
+import multiprocessing
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _registry(directory=None):
+    from app.metrics import Registry
+
+    registry = Registry(directory)
+    registry.counter("jobs_total", "Jobs.")
+    registry.histogram("job_seconds", "Job latency.", (0.1, 1.0))
+    return registry
+
+
+def _work(directory, count):
+    registry = _registry(directory)
+    for _ in range(count):
+        registry.inc("jobs_total", (("queue", "a"),))
+        registry.observe("job_seconds", (("queue", "a"),), 0.5)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = _registry()
+    labels = (("queue", "a"),)
+    for value in (0.05, 0.5, 5.0):
+        registry.observe("job_seconds", labels, value)
+
+    lines = registry.render().splitlines()
+    assert 'job_seconds_bucket{queue="a",le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{queue="a",le="1"} 2' in lines
+    assert 'job_seconds_bucket{queue="a",le="+Inf"} 3' in lines
+    assert 'job_seconds_count{queue="a"} 3' in lines
+    assert 'job_seconds_sum{queue="a"} 5.55' in lines
+
+
+def test_mmap_store_aggregates_worker_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_work, args=(str(tmp_path), 50)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    lines = _registry(str(tmp_path)).render().splitlines()
+    assert 'jobs_total{queue="a"} 150' in lines
+    assert 'job_seconds_count{queue="a"} 150' in lines
+
+
+def test_mmap_store_grows_and_reopens(tmp_path):
+    from app.metrics import MmapStore
+
+    path = str(tmp_path / "counters_1.db")
+    store = MmapStore(path, initial_size=64)
+    for i in range(100):
+        store.add(f"key-{i}", i)
+    store.add("key-7", 1)
+
+    assert dict(MmapStore.read(path))["key-7"] == 8
+    assert dict(MmapStore(path).items()) == dict(store.items())
+
+
+@pytest.fixture
+def client(db_session):
+    from app.main import app
+    from app.database import get_db
+    from app.models import User
+
+    db_session.add(User(api_key="test_metrics"))
+    db_session.commit()
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "internal_token", "secret")
+    client.get("/api/v1/expenses", headers={"X-API-Key": "test_metrics"})
+    client.get("/no/such/path")
+
+    response = client.get("/metrics", headers={"X-Internal-Token": "secret"})
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/v1/expenses",status="200"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'db_query_duration_seconds_count{statement="SELECT"}' in body
+    assert "# TYPE db_pool_checked_out gauge" in body
+    assert "auth_cache_hit_ratio{pid=" in body
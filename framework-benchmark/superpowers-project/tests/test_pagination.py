@@ -0,0 +1,19 @@
+import pytest
+from datetime import date
+from uuid import uuid4
+
+
+def test_cursor_round_trip():
+    from app.pagination import encode_cursor, decode_cursor
+
+    expense_id = uuid4()
+    cursor = encode_cursor(date(2024, 3, 1), expense_id)
+
+    assert decode_cursor(cursor) == (date(2024, 3, 1), expense_id)
+
+
+def test_decode_cursor_invalid():
+    from app.pagination import decode_cursor
+
+    with pytest.raises(ValueError):
+        decode_cursor("garbage")
@@ -0,0 +1,155 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.models import User, Expense, ExpenseCategory
+
+
+def _add_expenses(db_session, user, *days):
+    db_session.add_all(
+        Expense(user=user, amount=Decimal("1.00"), category=ExpenseCategory.FOOD, date=day)
+        for day in days
+    )
+    db_session.commit()
+
+
+def _rows_in(db_session, table):
+    return db_session.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def test_rows_without_a_partition_go_to_default(db_session):
+    from app.partitions import DEFAULT_PARTITION, list_partitions
+
+    user = User(api_key="test_partition_default")
+    db_session.add(user)
+    _add_expenses(db_session, user, date(1999, 1, 1))
+
+    assert list_partitions(db_session)[DEFAULT_PARTITION] is None
+    assert _rows_in(db_session, DEFAULT_PARTITION) == 1
+
+
+def test_ensure_partitions_is_idempotent(db_session):
+    from app.partitions import ensure_partitions, list_partitions
+
+    created = ensure_partitions(db_session, date(2024, 1, 15), date(2024, 3, 1), "month")
+    assert created == ["expenses_p2024_01", "expenses_p2024_02", "expenses_p2024_03"]
+    assert list_partitions(db_session)["expenses_p2024_02"] == (date(2024, 2, 1), date(2024, 3, 1))
+
+    assert ensure_partitions(db_session, date(2024, 1, 1), date(2024, 3, 31), "month") == []
+    # Months already covered are skipped when switching to yearly ranges.
+    assert ensure_partitions(db_session, date(2024, 1, 1), date(2025, 6, 1), "year") == ["expenses_p2025"]
+
+
+def test_ensure_partitions_moves_rows_out_of_default(db_session):
+    from app.partitions import DEFAULT_PARTITION, ensure_partitions
+
+    user = User(api_key="test_partition_move")
+    db_session.add(user)
+    _add_expenses(db_session, user, date(2023, 5, 2), date(2023, 5, 30), date(2023, 6, 1))
+
+    assert ensure_partitions(db_session, date(2023, 5, 1), date(2023, 5, 1), "month") == ["expenses_p2023_05"]
+    assert _rows_in(db_session, "expenses_p2023_05") == 2
+    assert _rows_in(db_session, DEFAULT_PARTITION) == 1
+    assert db_session.query(Expense).filter(Expense.user_id == user.id).count() == 3
+
+
+def test_date_filters_prune_partitions(db_session):
+    from app.partitions import ensure_partitions
+
+    ensure_partitions(db_session, date(2024, 1, 1), date(2024, 12, 1), "month")
+    plan = "\n".join(db_session.execute(text(
+        "EXPLAIN SELECT id FROM expenses WHERE user_id = gen_random_uuid() "
+        "AND date >= :start AND date < :end"
+    ), {"start": date(2024, 3, 5), "end": date(2024, 4, 1)}).scalars())
+
+    assert "expenses_p2024_03" in plan
+    assert "expenses_p2024_04" not in plan
+    assert "expenses_default" not in plan
+
+
+def test_cursor_pages_prune_newer_partitions(db_session):
+    from uuid import uuid4
+    from sqlalchemy import select
+    from app.crud import cursor_filters, expense_filters
+    from app.partitions import ensure_partitions
+
+    ensure_partitions(db_session, date(2024, 1, 1), date(2024, 12, 1), "month")
+    stmt = select(Expense.id).where(
+        *expense_filters(uuid4()), *cursor_filters((date(2024, 3, 5), uuid4()))
+    ).order_by(Expense.date.desc(), Expense.id.desc())
+    compiled = stmt.compile(dialect=db_session.bind.dialect)
+    plan = "\n".join(row[0] for row in db_session.connection().exec_driver_sql(
+        f"EXPLAIN {compiled}", compiled.params
+    ))
+
+    assert "expenses_p2024_03" in plan
+    assert "expenses_p2024_02" in plan
+    assert "expenses_p2024_04" not in plan
+
+
+def test_detach_partitions_for_archival(db_session):
+    from app.crud import get_data_version
+    from app.partitions import detach_partitions, ensure_partitions, list_partitions
+
+    ensure_partitions(db_session, date(2022, 1, 1), date(2022, 2, 1), "month")
+    user = User(api_key="test_partition_detach")
+    db_session.add(user)
+    _add_expenses(db_session, user, date(2022, 1, 10), date(2022, 2, 10))
+    version = get_data_version(db_session, user.id)
+
+    assert detach_partitions(db_session, date(2022, 2, 1)) == ["expenses_p2022_01"]
+    assert "expenses_p2022_01" not in list_partitions(db_session)
+    assert _rows_in(db_session, "expenses_p2022_01") == 1
+    assert db_session.query(Expense).filter(Expense.user_id == user.id).count() == 1
+    assert get_data_version(db_session, user.id) == version + 1
+
+
+def test_rebuild_keeps_rollups_of_detached_partitions(db_session):
+    from app.crud import get_monthly_summary
+    from app.partitions import detach_partitions, ensure_partitions
+    from app.rollups import rebuild
+
+    ensure_partitions(db_session, date(2021, 1, 1), date(2021, 1, 1), "month")
+    user = User(api_key="test_partition_archive")
+    db_session.add(user)
+    _add_expenses(db_session, user, date(2021, 1, 10), date(2021, 2, 10))
+    detach_partitions(db_session, date(2021, 2, 1))
+    db_session.commit()
+    # A row for the archived month written after the detach.
+    _add_expenses(db_session, user, date(2021, 1, 20))
+
+    rebuild(db_session, user.id)
+    assert get_monthly_summary(db_session, user.id, 2021, 1).grand_total == Decimal("2.00")
+    assert get_monthly_summary(db_session, user.id, 2021, 2).grand_total == Decimal("1.00")
+
+
+def test_concurrent_ensure_partitions_wait_for_each_other(engine):
+    import threading
+    from app.partitions import ensure_partitions
+
+    first, second = engine.connect(), engine.connect()
+    try:
+        first.begin()
+        assert ensure_partitions(first, date(2199, 1, 1), date(2199, 1, 1), "month") == ["expenses_p2199_01"]
+
+        # The second caller queues on the advisory lock and then sees the
+        # committed partition instead of failing with DuplicateTable.
+        result = []
+        second.begin()
+        waiter = threading.Thread(
+            target=lambda: result.append(ensure_partitions(second, date(2199, 1, 1), date(2199, 1, 1), "month"))
+        )
+        waiter.start()
+        waiter.join(timeout=0.2)
+        assert waiter.is_alive()
+
+        first.commit()
+        waiter.join()
+        assert result == [[]]
+        second.rollback()
+    finally:
+        first.close()
+        second.close()
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS expenses_p2199_01"))
@@ -0,0 +1,124 @@
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.models import User, Expense, ExpenseCategory
+from tests.conftest import second_database
+
+
+class _Factory:
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self):
+        session = Session()
+        session.info["name"] = self.name
+        return session
+
+
+def test_router_round_robins_replicas():
+    from app.replicas import ReadRouter
+
+    router = ReadRouter([_Factory("a"), _Factory("b")], sticky_seconds=60)
+    names = [router.replica_session(uuid4()).info["name"] for _ in range(4)]
+    assert names == ["a", "b", "a", "b"]
+
+
+def test_router_pins_recent_writers_to_primary():
+    from app.replicas import ReadRouter, is_replica
+
+    router = ReadRouter([_Factory("a")], sticky_seconds=60)
+    writer, reader = uuid4(), uuid4()
+    router.mark_written([writer])
+
+    assert router.replica_session(writer) is None
+    assert is_replica(router.replica_session(reader))
+
+
+def test_router_without_replicas_uses_primary():
+    from app.replicas import ReadRouter
+
+    router = ReadRouter([])
+    router.mark_written([uuid4()])
+    assert router.replica_session(uuid4()) is None
+    assert router.pinned.stats()["size"] == 0
+
+
+@pytest.fixture(scope="module")
+def replica_engine(engine):
+    with second_database("replica", settings.test_replica_database_url) as replica:
+        yield replica
+
+
+@pytest.fixture
+def replica_client(db_session, replica_engine, monkeypatch):
+    from app.main import app
+    from app.database import get_db
+    from app.replicas import ReadRouter
+    from app import replicas, rollups
+
+    # Nothing replicates between the two databases, so whichever one a
+    # read lands on shows in the response.
+    router = ReadRouter([sessionmaker(bind=replica_engine)], sticky_seconds=60)
+    monkeypatch.setattr(replicas, "read_router", router)
+    monkeypatch.setattr(rollups, "read_router", router)
+
+    def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app), router
+    app.dependency_overrides.clear()
+
+
+def test_reads_use_replica_until_user_writes(replica_client, db_session):
+    client, router = replica_client
+    user = User(api_key="test_replica_user")
+    db_session.add(user)
+    db_session.add(Expense(
+        user=user, amount=Decimal("5.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 5)
+    ))
+    db_session.commit()
+    router.pinned.clear()
+    headers = {"X-API-Key": user.api_key}
+
+    # Auth still reads the primary, where the user exists.
+    response = client.get("/api/v1/expenses", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["meta"]["total"] == 0
+
+    created = client.post(
+        "/api/v1/expenses", headers=headers,
+        json={"amount": "7.00", "category": "Food", "date": "2024-01-06"}
+    )
+    assert created.status_code == 201
+
+    response = client.get("/api/v1/expenses", headers=headers)
+    assert response.json()["meta"]["total"] == 2
+    detail = client.get(f"/api/v1/expenses/{created.json()['id']}", headers=headers)
+    assert detail.status_code == 200
+
+    router.pinned.clear()
+    detail = client.get(f"/api/v1/expenses/{created.json()['id']}", headers=headers)
+    assert detail.status_code == 404
+
+
+def test_replica_reads_do_not_fill_summary_cache(replica_client, db_session):
+    from app.summary_cache import summary_cache
+
+    client, _ = replica_client
+    user = User(api_key="test_replica_summary")
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.get(
+        "/api/v1/summary/monthly", headers={"X-API-Key": user.api_key},
+        params={"year": 2024, "month": 1}
+    )
+    assert response.status_code == 200
+    assert summary_cache.get((user.id, 2024, 1, 0)) is None
@@ -0,0 +1,101 @@
+import pytest
+from decimal import Decimal
+from datetime import date
+
+from app.models import User, Expense, ExpenseCategory, ExpenseRollup
+
+
+def _rollups(db_session, user):
+    return {
+        (r.period, r.category): (r.total, r.count)
+        for r in db_session.query(ExpenseRollup).filter(ExpenseRollup.user_id == user.id)
+    }
+
+
+def test_rollups_follow_create_update_delete(db_session):
+    from app.crud import create_expense, update_expense, delete_expense
+    from app.schemas import ExpenseCreate, ExpenseUpdate
+
+    user = User(api_key="test_rollups")
+    db_session.add(user)
+    db_session.commit()
+
+    first = create_expense(db_session, ExpenseCreate(
+        amount=Decimal("10.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 5)
+    ), user.id)
+    create_expense(db_session, ExpenseCreate(
+        amount=Decimal("5.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 20)
+    ), user.id)
+    assert _rollups(db_session, user) == {
+        (date(2024, 1, 1), ExpenseCategory.FOOD): (Decimal("15.00"), 2)
+    }
+
+    update_expense(db_session, first, ExpenseUpdate(
+        amount=Decimal("7.50"), category=ExpenseCategory.TRANSPORT, date=date(2024, 2, 1)
+    ))
+    assert _rollups(db_session, user) == {
+        (date(2024, 1, 1), ExpenseCategory.FOOD): (Decimal("5.00"), 1),
+        (date(2024, 2, 1), ExpenseCategory.TRANSPORT): (Decimal("7.50"), 1),
+    }
+
+    delete_expense(db_session, first)
+    assert _rollups(db_session, user) == {
+        (date(2024, 1, 1), ExpenseCategory.FOOD): (Decimal("5.00"), 1)
+    }
+
+
+def test_rollups_follow_delete_of_expired_instance(db_session):
+    user = User(api_key="test_rollup_expired")
+    db_session.add(user)
+    db_session.commit()
+
+    expense = Expense(
+        user_id=user.id, amount=Decimal("4.00"),
+        category=ExpenseCategory.FOOD, date=date(2024, 1, 1)
+    )
+    db_session.add(expense)
+    db_session.commit()
+
+    db_session.delete(expense)
+    db_session.commit()
+
+    assert _rollups(db_session, user) == {}
+
+
+def test_rebuild_repairs_drift(db_session):
+    from app.rollups import rebuild
+
+    user = User(api_key="test_rollup_rebuild")
+    db_session.add(user)
+    db_session.commit()
+
+    db_session.add(Expense(
+        user_id=user.id, amount=Decimal("12.00"),
+        category=ExpenseCategory.OTHER, date=date(2024, 3, 3)
+    ))
+    db_session.commit()
+
+    db_session.query(ExpenseRollup).update({"total": Decimal("999.00")})
+    db_session.commit()
+
+    rebuild(db_session, user.id)
+    assert _rollups(db_session, user) == {
+        (date(2024, 3, 1), ExpenseCategory.OTHER): (Decimal("12.00"), 1)
+    }
+
+
+def test_deleting_user_drops_rollups(db_session):
+    user = User(api_key="test_rollup_user_delete")
+    db_session.add(user)
+    db_session.commit()
+
+    db_session.add(Expense(
+        user_id=user.id, amount=Decimal("3.00"),
+        category=ExpenseCategory.FOOD, date=date(2024, 3, 3)
+    ))
+    db_session.commit()
+
+    db_session.delete(user)
+    db_session.commit()
+
+    assert db_session.query(ExpenseRollup).count() == 0
@@ -46,3 +46,10 @@ def test_expense_create_description_too_long():
             date=date.today()
         )
     assert "at most 255 characters" in str(exc_info.value)
+
+
+def test_expense_update_accepts_date():
+    from app.schemas import ExpenseUpdate
+
+    data = ExpenseUpdate(date=date(2024, 2, 1))
+    assert data.date == date(2024, 2, 1)
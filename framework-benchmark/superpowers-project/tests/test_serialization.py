@@ -0,0 +1,31 @@
+from decimal import Decimal
+from datetime import date, datetime
+
+from app.models import User, Expense, ExpenseCategory
+
+
+def test_fast_path_matches_pydantic_output(db_session):
+    from app.crud import get_expenses
+    from app.schemas import ExpenseOut
+    from app.serialization import dumps, expense_rows
+
+    user = User(api_key="test_serialization")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add_all([
+        Expense(
+            user_id=user.id, amount=Decimal("25.50"), category=ExpenseCategory.FOOD,
+            description="Lunch", date=date(2024, 1, 2)
+        ),
+        Expense(
+            user_id=user.id, amount=Decimal("3"), category=ExpenseCategory.OTHER,
+            date=date(2024, 1, 1), created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1)
+        ),
+    ])
+    db_session.commit()
+
+    rows, _, _ = get_expenses(db_session, user.id)
+    expected = [ExpenseOut.model_validate(row).model_dump_json() for row in rows]
+
+    assert dumps(expense_rows(rows)) == f"[{','.join(expected)}]".encode()
+    assert '"amount":"3.00"' in expected[1]
@@ -0,0 +1,198 @@
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models import User, Expense, ExpenseCategory, ExpenseRollup, IdempotencyKey
+from tests.conftest import second_database
+
+
+def test_ring_spreads_users_and_moves_few_on_growth():
+    from app.shards import HashRing
+
+    users = [uuid4() for _ in range(3000)]
+    two, three = HashRing(["a", "b"]), HashRing(["a", "b", "c"])
+
+    share = sum(two.lookup(u) == "a" for u in users) / len(users)
+    assert 0.35 < share < 0.65
+
+    # Growing to three shards only moves users onto the new one.
+    moved = [u for u in users if two.lookup(u) != three.lookup(u)]
+    assert all(three.lookup(u) == "c" for u in moved)
+    assert 0.2 < len(moved) / len(users) < 0.47
+
+
+def test_single_shard_owns_everyone():
+    from app.shards import PRIMARY, ShardMap
+
+    shards = ShardMap({PRIMARY: Session})
+    assert {shards.shard_for(uuid4()) for _ in range(100)} == {PRIMARY}
+
+
+@pytest.fixture(scope="module")
+def shard_engine(engine):
+    with second_database("shard1") as shard:
+        yield shard
+
+
+@pytest.fixture
+def shards(db_session, shard_engine):
+    from app.shards import PRIMARY, ShardMap
+
+    # Like db_session: everything done on the shard is rolled back after.
+    connection = shard_engine.connect()
+    transaction = connection.begin()
+    shard_sessions = []
+
+    def shard_session():
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        shard_sessions.append(session)
+        return session
+
+    try:
+        yield ShardMap({PRIMARY: lambda: db_session, "s1": shard_session})
+    finally:
+        for session in shard_sessions:
+            session.close()
+        transaction.rollback()
+        connection.close()
+
+
+def _user_on(shards, name):
+    return next(u for u in iter(uuid4, None) if shards.shard_for(u) == name)
+
+
+def test_create_user_writes_directory_and_shard(shards):
+    from app.shards import PRIMARY, create_user
+
+    user_id = create_user("test_shard_create", shards)
+    owner = shards.shard_for(user_id)
+    for name in {PRIMARY, owner}:
+        user = shards.session(name).get(User, user_id)
+        assert user.api_key == "test_shard_create"
+        assert user.data_moved is (name != owner)
+
+
+def test_rebalance_moves_misplaced_users(shards, db_session):
+    from app.shards import PRIMARY, rebalance
+
+    # A user the ring now assigns to s1 whose data predates that shard.
+    user = User(id=_user_on(shards, "s1"), api_key="test_shard_move")
+    db_session.add(user)
+    db_session.add_all([
+        Expense(user=user, amount=Decimal("4.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 2)),
+        Expense(user=user, amount=Decimal("6.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 9)),
+    ])
+    db_session.commit()
+    db_session.add(IdempotencyKey(
+        user_id=user.id, key="k", fingerprint="f", status_code=201,
+        response_body="{}", expires_at=date(2099, 1, 1)
+    ))
+    db_session.commit()
+    user_id = user.id
+
+    assert rebalance(shards, dry_run=True) == {(PRIMARY, "s1"): 1}
+    assert rebalance(shards) == {(PRIMARY, "s1"): 1}
+    assert rebalance(shards) == {}
+
+    db_session.expire_all()
+    assert db_session.get(User, user_id) is not None
+    assert db_session.query(Expense).filter(Expense.user_id == user_id).count() == 0
+    assert db_session.query(ExpenseRollup).filter(ExpenseRollup.user_id == user_id).count() == 0
+
+    shard = shards.session("s1")
+    assert shard.query(Expense).filter(Expense.user_id == user_id).count() == 2
+    rollup = shard.query(ExpenseRollup).filter(ExpenseRollup.user_id == user_id).one()
+    assert (rollup.total, rollup.count) == (Decimal("10.00"), 2)
+    assert shard.get(IdempotencyKey, (user_id, "k")) is not None
+
+
+def test_move_keeps_archived_rollups(shards, db_session):
+    from app.shards import PRIMARY, move_user
+
+    user = User(id=_user_on(shards, "s1"), api_key="test_shard_archived")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(ExpenseRollup(
+        user_id=user.id, period=date(2020, 1, 1), category=ExpenseCategory.FOOD,
+        total=Decimal("7.00"), count=2, archived=True
+    ))
+    db_session.commit()
+    user_id = user.id
+
+    move_user(user_id, PRIMARY, "s1", shards)
+    rollup = shards.session("s1").query(ExpenseRollup).filter(ExpenseRollup.user_id == user_id).one()
+    assert (rollup.total, rollup.count, rollup.archived) == (Decimal("7.00"), 2, True)
+
+
+def test_move_keeps_other_users_cached_summaries(shards, db_session):
+    from app.shards import PRIMARY, move_user
+    from app.schemas import MonthlySummary
+    from app.summary_cache import summary_cache
+
+    user = User(id=_user_on(shards, "s1"), api_key="test_shard_cache")
+    db_session.add(user)
+    db_session.commit()
+    other = (uuid4(), 2024, 1, 0)
+    summary = MonthlySummary(year=2024, month=1, grand_total=Decimal("1.00"), categories=[])
+    summary_cache.set(other, summary)
+
+    move_user(user.id, PRIMARY, "s1", shards)
+    assert summary_cache.get(other) == summary
+
+
+def test_writes_reaching_the_old_shard_fail_after_a_move(shards, db_session):
+    from app.crud import create_expense
+    from app.schemas import ExpenseCreate
+    from app.shards import PRIMARY, UserMoved, move_user
+
+    user = User(id=_user_on(shards, "s1"), api_key="test_shard_fence")
+    db_session.add(user)
+    db_session.commit()
+    user_id = user.id
+    move_user(user_id, PRIMARY, "s1", shards)
+
+    expense = ExpenseCreate(amount=Decimal("1.00"), category="Food", date=date(2024, 1, 2))
+    with pytest.raises(UserMoved):
+        create_expense(db_session, expense, user_id)
+    db_session.rollback()
+    assert db_session.query(Expense).filter(Expense.user_id == user_id).count() == 0
+
+    # The user's new shard takes the write.
+    create_expense(shards.session("s1"), expense, user_id)
+
+
+def test_requests_use_the_users_shard(shards, db_session, monkeypatch):
+    from app.main import app
+    from app.database import get_db
+    from app import replicas, shards as shards_module
+
+    monkeypatch.setattr(shards_module, "shard_map", shards)
+    monkeypatch.setattr(replicas, "shard_map", shards)
+    app.dependency_overrides[get_db] = lambda: db_session
+
+    user_id = _user_on(shards, "s1")
+    db_session.add(User(id=user_id, api_key="test_shard_routing"))
+    db_session.commit()
+    shard = shards.session("s1")
+    shard.add(User(id=user_id, api_key="test_shard_routing"))
+    shard.commit()
+
+    try:
+        client = TestClient(app)
+        headers = {"X-API-Key": "test_shard_routing"}
+        created = client.post(
+            "/api/v1/expenses", headers=headers,
+            json={"amount": "3.50", "category": "Food", "date": "2024-01-15"}
+        )
+        assert created.status_code == 201
+        listed = client.get("/api/v1/expenses", headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert listed.json()["meta"]["total"] == 1
+    assert db_session.query(Expense).filter(Expense.user_id == user_id).count() == 0
+    assert shards.session("s1").query(Expense).filter(Expense.user_id == user_id).count() == 1
@@ -0,0 +1,116 @@
+from decimal import Decimal
+from datetime import date
+
+from app.models import User, ExpenseCategory
+
+
+def _user(db_session, api_key):
+    user = User(api_key=api_key)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def test_monthly_summary_is_cached(db_session):
+    from app.crud import create_expense, get_monthly_summary
+    from app.schemas import ExpenseCreate
+    from app.summary_cache import summary_cache
+
+    user = _user(db_session, "test_summary_cached")
+    create_expense(db_session, ExpenseCreate(
+        amount=Decimal("10.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 5)
+    ), user.id)
+
+    before = summary_cache.stats()
+    first = get_monthly_summary(db_session, user.id, 2024, 1)
+    second = get_monthly_summary(db_session, user.id, 2024, 1)
+    after = summary_cache.stats()
+
+    assert first == second
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_writes_invalidate_cached_summary(db_session):
+    from app.crud import (
+        create_expense, update_expense_by_id, delete_expense_by_id, get_monthly_summary
+    )
+    from app.schemas import ExpenseCreate, ExpenseUpdate
+
+    user = _user(db_session, "test_summary_invalidate")
+    expense = create_expense(db_session, ExpenseCreate(
+        amount=Decimal("10.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 5)
+    ), user.id)
+    assert get_monthly_summary(db_session, user.id, 2024, 1).grand_total == Decimal("10.00")
+
+    create_expense(db_session, ExpenseCreate(
+        amount=Decimal("5.00"), category=ExpenseCategory.FOOD, date=date(2024, 1, 6)
+    ), user.id)
+    assert get_monthly_summary(db_session, user.id, 2024, 1).grand_total == Decimal("15.00")
+
+    update_expense_by_id(db_session, expense.id, user.id, ExpenseUpdate(date=date(2024, 2, 1)))
+    assert get_monthly_summary(db_session, user.id, 2024, 1).grand_total == Decimal("5.00")
+    assert get_monthly_summary(db_session, user.id, 2024, 2).grand_total == Decimal("10.00")
+
+    delete_expense_by_id(db_session, expense.id, user.id)
+    assert get_monthly_summary(db_session, user.id, 2024, 2).grand_total == Decimal("0")
+
+
+def test_summary_cached_before_a_write_is_not_served_after_it(db_session):
+    from app import rollups
+    from app.crud import get_data_version, get_monthly_summary
+    from app.summary_cache import summary_cache
+
+    user = _user(db_session, "test_summary_race")
+    # A reader that looked up version 0 and stores its summary only after
+    # the write below has committed.
+    stale = get_monthly_summary(db_session, user.id, 2024, 1)
+
+    deltas = rollups.new_deltas()
+    rollups.add_delta(deltas, user.id, date(2024, 1, 3), ExpenseCategory.FOOD, Decimal("1.00"))
+    rollups.apply_deltas(db_session, deltas)
+    db_session.commit()
+    summary_cache.set((user.id, 2024, 1, 0), stale)
+
+    assert get_data_version(db_session, user.id) == 1
+    assert get_monthly_summary(db_session, user.id, 2024, 1).grand_total == Decimal("1.00")
+
+
+def test_shared_backend_round_trips_summaries():
+    from uuid import uuid4
+    from app.schemas import MonthlySummary, MonthlySummaryItem
+    from app.summary_cache import InMemoryKV, SharedSummaryCache
+
+    kv = InMemoryKV()
+    cache = SharedSummaryCache(kv, ttl=60)
+    key = (uuid4(), 2024, 3, 7)
+    summary = MonthlySummary(
+        year=2024, month=3, grand_total=Decimal("12.50"),
+        categories=[MonthlySummaryItem(category=ExpenseCategory.FOOD, total=Decimal("12.50"))]
+    )
+
+    assert cache.get(key) is None
+    cache.set(key, summary)
+    assert cache.get(key) == summary
+    assert kv.get(f"summary:{key[0]}:2024-03:7") is not None
+
+    cache.invalidate([key])
+    assert cache.get(key) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_shared_backend_clear_keeps_foreign_keys():
+    from uuid import uuid4
+    from app.schemas import MonthlySummary
+    from app.summary_cache import InMemoryKV, SharedSummaryCache
+
+    kv = InMemoryKV()
+    kv.set("sessions:abc", "keep")
+    cache = SharedSummaryCache(kv, ttl=60)
+    key = (uuid4(), 2024, 3, 0)
+    cache.set(key, MonthlySummary(year=2024, month=3, grand_total=Decimal("0"), categories=[]))
+
+    cache.clear()
+    assert cache.get(key) is None
+    assert kv.get("sessions:abc") == b"keep"